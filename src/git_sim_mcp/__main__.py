@@ -3,10 +3,15 @@
 import sys
 import argparse
 import logging
+from typing import Optional, Sequence
 
 
-def main():
-    """Main CLI entry point."""
+def main(argv: Optional[Sequence[str]] = None):
+    """Main CLI entry point.
+
+    Args:
+        argv: Command-line arguments, defaulting to sys.argv[1:]
+    """
     parser = argparse.ArgumentParser(
         description="git-sim MCP Server - Model Context Protocol server for git-sim"
     )
@@ -35,7 +40,7 @@ def main():
         help="Logging level (default: INFO)",
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Configure logging
     logging.basicConfig(
@@ -56,10 +61,15 @@ def main():
 
         asyncio.run(server_main())
     elif args.transport == "sse":
-        from git_sim_mcp.sse_server import main as sse_main
-        import asyncio
+        from git_sim_mcp.sse_server import main as sse_main, run
+
+        if args.host in {"127.0.0.1", "localhost"}:
+            logging.getLogger("git-sim-mcp").warning(
+                "For local MCP clients, stdio transport is typically 10x "
+                "lower-latency; consider --transport stdio"
+            )
 
-        asyncio.run(sse_main(host=args.host, port=args.port))
+        run(sse_main(host=args.host, port=args.port))
     else:
         print(f"Unknown transport: {args.transport}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,108 @@
+"""Track whether directories still exist, through inotify when available.
+
+Each request for an already cloned repository checks that its clone has
+not been removed in the meantime. With inotify_simple installed, clones
+are watched for being deleted or moved, and the event loop processes the
+notifications as they arrive, so that check only reads the notifications
+still pending, if any, instead of looking the path up.
+
+Paths that are not watched, e.g. without inotify_simple, on platforms
+other than Linux, or when no more watches can be added, are checked with
+os.path.exists() instead, as are all paths when the watches were set up
+on a different event loop than the one that is running.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Set
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+logger = logging.getLogger("git-sim-mcp")
+
+
+class PathWatcher:
+    """Watch directories for being deleted or moved away."""
+
+    def __init__(self):
+        self._inotify = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._paths: Dict[int, str] = {}  # Maps watch descriptor -> path
+        self._watched: Set[str] = set()
+
+    def watch(self, path: str) -> None:
+        """Start watching a directory, if inotify is available."""
+        if inotify_simple is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            if self._inotify is None:
+                self._inotify = inotify_simple.INotify(nonblocking=True)
+            if loop is not self._loop:
+                # Notifications received on another loop may have been missed
+                self._detach()
+                loop.add_reader(self._inotify.fileno(), self._read_events)
+                self._loop = loop
+            wd = self._inotify.add_watch(
+                path, inotify_simple.flags.DELETE_SELF | inotify_simple.flags.MOVE_SELF
+            )
+        except (OSError, RuntimeError, NotImplementedError) as e:
+            logger.debug(f"Not watching {path}: {e}")
+            return
+
+        self._paths[wd] = path
+        self._watched.add(path)
+
+    def exists(self, path: str) -> bool:
+        """Check whether a directory still exists."""
+        if path in self._watched:
+            try:
+                if asyncio.get_running_loop() is self._loop:
+                    # The loop may not have processed a recent removal yet
+                    self._read_events()
+                    return path in self._watched
+            except RuntimeError:
+                pass
+        return os.path.exists(path)
+
+    def clear(self) -> None:
+        """Stop watching all directories."""
+        self._detach()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _detach(self) -> None:
+        """Stop processing notifications on the current event loop."""
+        if self._loop is not None:
+            self._loop.remove_reader(self._inotify.fileno())
+            self._loop = None
+        for wd in self._paths:
+            try:
+                self._inotify.rm_watch(wd)
+            except OSError:
+                pass
+        self._paths.clear()
+        self._watched.clear()
+
+    def _read_events(self) -> None:
+        """Forget the directories that were deleted or moved away."""
+        try:
+            events = self._inotify.read(timeout=0)
+        except OSError:
+            return
+        for event in events:
+            path = self._paths.pop(event.wd, None)
+            if path is None:
+                continue
+            self._watched.discard(path)
+            if event.mask & inotify_simple.flags.MOVE_SELF:
+                # Moved directories stay watched until told otherwise
+                try:
+                    self._inotify.rm_watch(event.wd)
+                except OSError:
+                    pass
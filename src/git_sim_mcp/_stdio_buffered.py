@@ -0,0 +1,237 @@
+"""stdio transport reading stdin through an asyncio BufferedProtocol.
+
+The MCP SDK's stdio transport reads stdin through a worker thread, one
+freshly allocated line at a time. Here stdin is watched by the event loop
+and read with readv() straight into a reusable buffer, and each JSON-RPC
+frame is copied out exactly once when its newline arrives. asyncio's own
+pipe transport only supports data_received(), so a minimal read transport
+drives the protocol instead.
+
+When stdin cannot be watched by the event loop (e.g. it is a regular
+file, or the platform has no add_reader() or readv()), this falls back to
+the SDK's ``stdio_server()``.
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+from io import TextIOWrapper
+from typing import Optional
+
+import anyio
+import anyio.lowlevel
+import mcp.server.stdio
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+
+# Initial size of the stdin read buffer; it grows to fit longer frames
+_BUFFER_SIZE = 64 * 1024
+
+# Pause reading stdin while this many frames are waiting to be parsed
+_HIGH_WATER = 32
+_LOW_WATER = 8
+
+
+class BufferedStdio(asyncio.BufferedProtocol):
+    """Split a byte stream into lines without an intermediate copy per read.
+
+    Complete lines are put on ``lines``, followed by None at end of file.
+    Reading pauses while too many lines are waiting to be consumed.
+    """
+
+    def __init__(self, lines: asyncio.Queue) -> None:
+        self.lines = lines
+        self._transport: Optional[asyncio.ReadTransport] = None
+        self._paused = False
+        self._buffer = bytearray(_BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # Start of the unconsumed data
+        self._end = 0  # End of the data received so far
+        self._closed = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._end == len(self._buffer):
+            pending = self._end - self._start
+            if self._start:
+                # Move the partial line to the front of the buffer
+                self._buffer[:pending] = self._view[self._start : self._end].tobytes()
+            else:
+                # The buffer holds one partial line; make room for more
+                buffer = bytearray(len(self._buffer) * 2)
+                buffer[:pending] = self._view[: self._end]
+                self._view.release()
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            self._start = 0
+            self._end = pending
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        scan_from = self._end
+        self._end += nbytes
+        while (newline := self._buffer.find(b"\n", scan_from, self._end)) != -1:
+            self._put(bytes(self._view[self._start : newline]))
+            self._start = scan_from = newline + 1
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def eof_received(self) -> bool:
+        if self._start < self._end:
+            self._put(bytes(self._view[self._start : self._end]))
+            self._start = self._end = 0
+        self._close()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._close()
+
+    def resume(self) -> None:
+        """Resume reading once the consumer has caught up."""
+        if self._paused and self.lines.qsize() <= _LOW_WATER:
+            self._paused = False
+            self._transport.resume_reading()
+
+    def _put(self, line: bytes) -> None:
+        self.lines.put_nowait(line)
+        if not self._paused and self.lines.qsize() >= _HIGH_WATER:
+            self._paused = True
+            self._transport.pause_reading()
+
+    def _close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.lines.put_nowait(None)
+
+
+class _PipeReader(asyncio.ReadTransport):
+    """Read a non-blocking file descriptor into a BufferedProtocol."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        fileno: int,
+        protocol: asyncio.BufferedProtocol,
+    ) -> None:
+        super().__init__()
+        self._loop = loop
+        self._fileno = fileno
+        self._protocol = protocol
+        self._reading = False
+        self._closing = False
+
+        os.set_blocking(fileno, False)
+        try:
+            self.resume_reading()
+        except BaseException:
+            os.set_blocking(fileno, True)
+            raise
+        protocol.connection_made(self)
+
+    def _read_ready(self) -> None:
+        try:
+            nbytes = os.readv(self._fileno, [self._protocol.get_buffer(-1)])
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            self._close(exc)
+            return
+
+        if nbytes:
+            self._protocol.buffer_updated(nbytes)
+        else:
+            self.pause_reading()
+            self._protocol.eof_received()
+            self.close()
+
+    def is_reading(self) -> bool:
+        return self._reading
+
+    def pause_reading(self) -> None:
+        if self._reading:
+            self._reading = False
+            self._loop.remove_reader(self._fileno)
+
+    def resume_reading(self) -> None:
+        if not self._reading and not self._closing:
+            self._loop.add_reader(self._fileno, self._read_ready)
+            self._reading = True
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        self._close(None)
+
+    def _close(self, exc: Optional[Exception]) -> None:
+        if not self._closing:
+            self.pause_reading()
+            self._closing = True
+            os.set_blocking(self._fileno, True)
+            self._protocol.connection_lost(exc)
+
+
+@asynccontextmanager
+async def stdio_server():
+    """Server transport for stdio, reading stdin with BufferedStdio.
+
+    Yields the same (read_stream, write_stream) pair as the SDK's
+    ``mcp.server.stdio.stdio_server()``.
+    """
+    lines: asyncio.Queue = asyncio.Queue()
+    protocol = BufferedStdio(lines)
+
+    try:
+        if not hasattr(os, "readv"):
+            raise NotImplementedError("os.readv() is not available")
+        transport = _PipeReader(
+            asyncio.get_running_loop(), sys.stdin.fileno(), protocol
+        )
+    except (ValueError, OSError, NotImplementedError):
+        async with mcp.server.stdio.stdio_server() as streams:
+            yield streams
+        return
+
+    stdout = anyio.wrap_file(TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def stdin_reader():
+        try:
+            async with read_stream_writer:
+                while (line := await lines.get()) is not None:
+                    protocol.resume()
+                    if not line.strip():
+                        continue
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+                    await read_stream_writer.send(SessionMessage(message))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    json = session_message.message.model_dump_json(
+                        by_alias=True, exclude_none=True
+                    )
+                    await stdout.write(json + "\n")
+                    await stdout.flush()
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    try:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(stdin_reader)
+            tg.start_soon(stdout_writer)
+            yield read_stream, write_stream
+    finally:
+        transport.close()
@@ -4,13 +4,25 @@ import asyncio
 import atexit
 import base64
 import logging
+import mmap
 import os
+import re
+import shlex
 import shutil
+import sys
 import tempfile
+import threading
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
-
-from mcp.server import Server
+from types import MappingProxyType
+from typing import Any, Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional
+from typing import Sequence, Tuple
+from urllib.parse import urlparse
+
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import best_match
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.types import (
     Tool,
@@ -18,9 +30,17 @@ from mcp.types import (
     ImageContent,
     EmbeddedResource,
 )
-import mcp.server.stdio
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
 
 from git_sim_mcp import __version__
+from git_sim_mcp._path_watch import PathWatcher
+from git_sim_mcp._stdio_buffered import stdio_server
+from git_sim_mcp._uring_rmtree import uring_rmtree
+from git_sim_mcp.workers import GitSimWorkerPool, worker_pool_size
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,19 +49,63 @@ logger = logging.getLogger("git-sim-mcp")
 # Initialize MCP server
 server = Server("git-sim-mcp")
 
+
+class _Clone(NamedTuple):
+    """A repository cloned during the session."""
+
+    local_path: str
+    depth: Optional[int]  # Commits of history fetched, None for all
+    host: Optional[str]  # Host of the repository URL, None for local paths
+    partial: bool  # File contents are only fetched when first read
+
+
 # Session storage for cloned repositories
-_cloned_repos: Dict[str, str] = {}  # Maps repo_url -> local_path
+# Repositories are stored under the key from _repo_key()
+_cloned_repos: Dict[str, _Clone] = {}
+_clone_watcher = PathWatcher()  # Notices clones removed behind our back
+
+
+def _remove_cloned_repo(local_path: str):
+    """Remove a cloned repository, logging rather than raising any error."""
+    try:
+        if os.path.exists(local_path):
+            logger.info(f"Cleaning up cloned repo: {local_path}")
+            shutil.rmtree(local_path)
+    except Exception as e:
+        logger.warning(f"Failed to clean up {local_path}: {e}")
+
+
+def _remove_cloned_repos(paths: Iterator[str]):
+    """Remove cloned repositories until none are left."""
+    for local_path in paths:
+        _remove_cloned_repo(local_path)
 
 
 def cleanup_cloned_repos():
-    """Clean up all temporary cloned repositories."""
-    for repo_url, local_path in _cloned_repos.items():
+    """Clean up all temporary cloned repositories, removing them in parallel."""
+    _clone_watcher.clear()
+    if _cloned_repos:
+        # Remove the bulk of the files through io_uring, if available, and
+        # anything left over with shutil.rmtree()
+        local_paths = [clone.local_path for clone in _cloned_repos.values()]
+        uring_rmtree(local_paths)
+
+        # Plain threads, since a ThreadPoolExecutor takes no work once the
+        # interpreter is shutting down, as it is when this runs at exit
+        paths = iter(local_paths)
+        threads = []
         try:
-            if os.path.exists(local_path):
-                logger.info(f"Cleaning up cloned repo: {local_path}")
-                shutil.rmtree(local_path)
-        except Exception as e:
-            logger.warning(f"Failed to clean up {local_path}: {e}")
+            for _ in range(min(len(local_paths), 8)):
+                thread = threading.Thread(target=_remove_cloned_repos, args=(paths,))
+                thread.start()
+                threads.append(thread)
+        except RuntimeError:
+            # Python 3.12 and later start no new threads at exit at all
+            pass
+        # Remove whatever the threads have not taken, if any were started
+        _remove_cloned_repos(paths)
+        for thread in threads:
+            thread.join()
     _cloned_repos.clear()
 
 
@@ -52,6 +116,89 @@ atexit.register(cleanup_cloned_repos)
 CLONE_TIMEOUT_SECONDS = 5 * 60  # 5 minutes
 EXECUTE_TIMEOUT_SECONDS = 5 * 60  # 5 minutes
 
+# Lines of git-sim's output kept for the response; the media path is last
+OUTPUT_TAIL_LINES = 1024
+
+# Longer output lines (e.g. redrawn progress bars) are skipped
+_LINE_LIMIT = 1024 * 1024
+
+
+def _concurrency_limit(name: str, default: int) -> int:
+    """Get a concurrency limit from an environment variable.
+
+    Invalid values fall back to the default, and the limit is at least 1,
+    since a limit of 0 would make every call wait forever.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name} value")
+        return default
+    return max(1, limit)
+
+
+# Rendering is CPU-bound, so cap the number of concurrent git-sim processes
+_execute_semaphore = asyncio.Semaphore(
+    _concurrency_limit("GIT_SIM_MAX_CONCURRENCY", os.cpu_count() or 1)
+)
+
+# Cap the number of concurrent clones and fetches
+_clone_semaphore = asyncio.Semaphore(_concurrency_limit("GIT_SIM_CLONE_CONCURRENCY", 4))
+
+
+def _spawn_options(program: str) -> Dict[str, Any]:
+    """Get the options for starting a program, set by GIT_SIM_SPAWN.
+
+    With "posix_spawn" (the default), file descriptors are not closed in
+    the child, which is safe as Python creates them non-inheritable. That,
+    and an absolute path to the program, lets Python start children that
+    need no working directory with posix_spawn() instead of fork(). With
+    "fork", or if the program is not found, Python's default behavior is
+    kept.
+    """
+    spawn = os.getenv("GIT_SIM_SPAWN", "posix_spawn").lower()
+    if spawn == "fork":
+        return {}
+    if spawn != "posix_spawn":
+        logger.warning("Ignoring invalid GIT_SIM_SPAWN value")
+
+    executable = shutil.which(program)
+    if not executable:
+        return {}
+    return {"close_fds": False, "executable": executable}
+
+
+# git-sim runs in the repository directory, so only git can use posix_spawn()
+_GIT_SPAWN_OPTIONS = _spawn_options("git")
+
+# Persistent git-sim workers, if enabled with GIT_SIM_WORKERS
+_WORKER_COUNT = worker_pool_size()
+_worker_pool = GitSimWorkerPool(_WORKER_COUNT) if _WORKER_COUNT else None
+
+# git-sim ends its output with the path of the generated media file, alone
+# with --output-only-path and otherwise as "Output image location: <path>"
+_MEDIA_PATH_RE = re.compile(r"(?:.*location: )?(.+\.(?:jpg|png|mp4|webm))")
+
+# git-sim flags that may be passed through 'extra_flags'
+_SAFE_EXTRA_FLAGS = frozenset(
+    {
+        "--quiet",
+        "-q",
+        "--reverse",
+        "-r",
+        "--all",
+        "--invert-branches",
+        "--hide-merged-branches",
+        "--highlight-commit-messages",
+    }
+)
+
+# MIME types of media files that can be embedded in tool responses
+_SUFFIX_MIME = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
 
 # Tool parameter schema for clone-repo command
 CLONE_REPO_TOOL_SCHEMA = {
@@ -66,6 +213,28 @@ CLONE_REPO_TOOL_SCHEMA = {
             "description": "Optional branch to checkout after cloning",
             "default": None,
         },
+        "depth": {
+            "type": ["integer", "null"],
+            "description": (
+                "Number of commits of history to fetch, for a faster shallow "
+                "clone (default: null, the full history)"
+            ),
+            "minimum": 1,
+            "default": None,
+        },
+        "single_branch": {
+            "type": "boolean",
+            "description": "Only fetch the branch being checked out (default: false)",
+            "default": False,
+        },
+        "partial": {
+            "type": "boolean",
+            "description": (
+                "Only download file contents when they are first needed "
+                "(default: true)"
+            ),
+            "default": True,
+        },
     },
     "required": ["repo_url"],
 }
@@ -182,6 +351,77 @@ GIT_SIM_TOOL_SCHEMA = {
     "required": ["command"],
 }
 
+# Compile the tool schemas once; the MCP SDK would otherwise rebuild a
+# validator from the raw schema on every tool call.
+Draft7Validator.check_schema(CLONE_REPO_TOOL_SCHEMA)
+Draft7Validator.check_schema(GIT_SIM_TOOL_SCHEMA)
+_VALIDATORS = {
+    "clone-repo": Draft7Validator(CLONE_REPO_TOOL_SCHEMA),
+    "git-sim": Draft7Validator(GIT_SIM_TOOL_SCHEMA),
+}
+_ALLOWED_COMMANDS = frozenset(GIT_SIM_TOOL_SCHEMA["properties"]["command"]["enum"])
+
+
+def _validate(name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """Validate tool arguments, returning an error message if they are invalid."""
+    # Unknown subcommands are the most common mistake; reject them with a
+    # single set lookup before walking the whole schema
+    if name == "git-sim":
+        command = arguments.get("command")
+        if isinstance(command, str) and command not in _ALLOWED_COMMANDS:
+            return f"{command!r} is not a valid git-sim command"
+
+    validator = _VALIDATORS.get(name)
+    if validator is None:
+        return None
+    error = best_match(validator.iter_errors(arguments))
+    return error.message if error is not None else None
+
+
+# Global git-sim options, in command-line order: (parameter, flag, takes_value)
+_GLOBAL_OPTIONS = (
+    ("animate", "--animate", False),
+    ("n", "-n", True),
+    ("light_mode", "--light-mode", False),
+    ("img_format", "--img-format", True),
+    ("video_format", "--video-format", True),
+    ("low_quality", "--low-quality", False),
+    ("reverse", "--reverse", False),
+    ("all_branches", "--all", False),
+    ("media_dir", "--media-dir", True),
+    ("output_only_path", "--output-only-path", False),
+)
+
+# Options that only apply to animations
+_ANIMATION_OPTIONS = frozenset({"video_format", "low_quality"})
+
+
+@lru_cache(maxsize=512)
+def _build_cached(
+    command: str, args: Tuple[str, ...], extra_flags: Tuple[str, ...], **options
+) -> Tuple[str, ...]:
+    """Build a git-sim command; clients tend to repeat the same few calls."""
+    cmd = ["git-sim"]
+
+    for name, flag, takes_value in _GLOBAL_OPTIONS:
+        value = options[name]
+        if name in _ANIMATION_OPTIONS and not options["animate"]:
+            continue
+        if takes_value:
+            if value is not None and value != "":
+                cmd.extend((flag, str(value)))
+        elif value:
+            cmd.append(flag)
+
+    # Disable auto-opening of files
+    cmd.append("-d")
+
+    cmd.extend(extra_flags)
+    cmd.append(command)
+    cmd.extend(args)
+
+    return tuple(cmd)
+
 
 def build_git_sim_command(
     command: str,
@@ -198,53 +438,87 @@ def build_git_sim_command(
     media_dir: Optional[str] = None,
     output_only_path: bool = False,
     extra_flags: List[str] = None,
-) -> List[str]:
+) -> Tuple[str, ...]:
     """Build the git-sim command with all options."""
-    cmd = ["git-sim"]
-
-    # Add global options
-    if animate:
-        cmd.append("--animate")
-
-    cmd.extend(["-n", str(n)])
-
-    if light_mode:
-        cmd.append("--light-mode")
-
-    cmd.extend(["--img-format", img_format])
-
-    if animate:
-        cmd.extend(["--video-format", video_format])
-        if low_quality:
-            cmd.append("--low-quality")
-
-    if reverse:
-        cmd.append("--reverse")
-
-    if all_branches:
-        cmd.append("--all")
-
-    if media_dir:
-        cmd.extend(["--media-dir", media_dir])
-
-    if output_only_path:
-        cmd.append("--output-only-path")
-
-    # Disable auto-opening of files
-    cmd.append("-d")
-
-    # Add extra flags if provided
-    if extra_flags:
-        cmd.extend(extra_flags)
-
-    # Add the subcommand
-    cmd.append(command)
+    return _build_cached(
+        command,
+        tuple(args or ()),
+        tuple(extra_flags or ()),
+        animate=animate,
+        n=n,
+        light_mode=light_mode,
+        img_format=img_format,
+        video_format=video_format,
+        low_quality=low_quality,
+        reverse=reverse,
+        all_branches=all_branches,
+        media_dir=media_dir,
+        output_only_path=output_only_path,
+    )
+
+
+async def _drain(stream: asyncio.StreamReader, max_lines: int) -> bytes:
+    """Read a stream to the end, keeping only its last non-empty lines."""
+    lines: Deque[bytes] = deque(maxlen=max_lines)
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # The stream has already discarded the overlong line
+            continue
+        if not line:
+            return b"".join(lines)
+        if line.strip():
+            lines.append(line)
+
+
+async def _communicate_tail(
+    process: asyncio.subprocess.Process, stdout_lines: int
+) -> Tuple[bytes, bytes]:
+    """Like communicate(), but keep only the last lines of the output."""
+    stdout, stderr = await asyncio.gather(
+        _drain(process.stdout, stdout_lines),
+        _drain(process.stderr, OUTPUT_TAIL_LINES),
+    )
+    await process.wait()
+    return stdout, stderr
+
+
+async def _run_git_sim_process(
+    cmd: Sequence[str], repo_path: str, output_only_path: bool = False
+) -> Tuple[int, str, str]:
+    """Run git-sim in a new process, killing it if it exceeds the timeout.
+
+    The output is streamed, keeping only its last OUTPUT_TAIL_LINES lines,
+    so progress output from long renders is never buffered in memory. With
+    output_only_path, only the last line of stdout (the media path) is kept.
+    """
+    async with _execute_semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=repo_path,
+            limit=_LINE_LIMIT,
+        )
 
-    # Add positional arguments
-    if args:
-        cmd.extend(args)
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                _communicate_tail(
+                    process, 1 if output_only_path else OUTPUT_TAIL_LINES
+                ),
+                timeout=EXECUTE_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
 
-    return cmd
+    return (
+        process.returncode,
+        stdout.decode("utf-8", errors="ignore"),
+        stderr.decode("utf-8", errors="ignore"),
+    )
 
 
 async def execute_git_sim(
@@ -256,7 +530,7 @@ async def execute_git_sim(
     Returns:
         Dictionary containing:
         - success: bool indicating if command succeeded
-        - output: stdout from command
+        - output: stdout from command (its last OUTPUT_TAIL_LINES lines)
         - error: stderr from command (if any)
         - media_path: path to generated media file (if any)
         - media_data: base64-encoded media data (for images)
@@ -267,66 +541,44 @@ async def execute_git_sim(
             command=command, args=args or [], repo_path=repo_path, **options
         )
 
-        logger.info(f"Executing command: {' '.join(cmd)}")
+        command_line = shlex.join(cmd)
+        logger.info("Executing command: %s", command_line)
 
         # Execute the command with timeout
-        result = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=repo_path,
-        )
-
-        # Add timeout to prevent hanging
         try:
-            stdout, stderr = await asyncio.wait_for(
-                result.communicate(), timeout=EXECUTE_TIMEOUT_SECONDS
-            )
+            if _worker_pool is not None:
+                returncode, stdout_str, stderr_str = await asyncio.wait_for(
+                    _worker_pool.run(cmd, repo_path), timeout=EXECUTE_TIMEOUT_SECONDS
+                )
+            else:
+                returncode, stdout_str, stderr_str = await _run_git_sim_process(
+                    cmd, repo_path, options.get("output_only_path", False)
+                )
         except asyncio.TimeoutError:
-            result.kill()
-            await result.wait()
             return {
                 "success": False,
                 "output": "",
                 "error": f"Command execution timed out after {EXECUTE_TIMEOUT_SECONDS} seconds",
-                "command": " ".join(cmd),
+                "command": command_line,
                 "return_code": -1,
             }
 
-        stdout_str = stdout.decode("utf-8", errors="ignore")
-        stderr_str = stderr.decode("utf-8", errors="ignore")
-
-        success = result.returncode == 0
+        success = returncode == 0
 
         response = {
             "success": success,
             "output": stdout_str,
             "error": stderr_str if stderr_str else None,
-            "command": " ".join(cmd),
-            "return_code": result.returncode,
+            "command": command_line,
+            "return_code": returncode,
         }
 
-        # Try to extract the media file path from output
+        # Try to extract the media file path from the last line of output
         if success and stdout_str:
-            # When output_only_path is used, stdout contains just the path
-            if options.get("output_only_path", False):
-                media_path = stdout_str.strip()
-                if media_path and Path(media_path).exists():
-                    response["media_path"] = media_path
-            else:
-                # Try to find the path in the output
-                for line in stdout_str.split("\n"):
-                    if "git-sim_media" in line or line.endswith(
-                        (".jpg", ".png", ".mp4", ".webm")
-                    ):
-                        # Extract path from output
-                        parts = line.strip().split()
-                        for part in parts:
-                            if Path(part).exists() and part.endswith(
-                                (".jpg", ".png", ".mp4", ".webm")
-                            ):
-                                response["media_path"] = part
-                                break
+            last_line = stdout_str.rstrip().rpartition("\n")[2].strip()
+            match = _MEDIA_PATH_RE.fullmatch(last_line)
+            if match and os.path.exists(match[1]):
+                response["media_path"] = match[1]
 
         return response
 
@@ -336,17 +588,231 @@ async def execute_git_sim(
             "success": False,
             "output": "",
             "error": str(e),
-            "command": " ".join(cmd) if "cmd" in locals() else None,
+            "command": command_line if "command_line" in locals() else None,
         }
 
 
-async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, Any]:
+# Environment for git commands when SSH host key checking is disabled, built
+# once from the server's environment. Otherwise git inherits the environment.
+_SSH_ENV = MappingProxyType(
+    {
+        **os.environ,
+        "GIT_SSH_COMMAND": (
+            "ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
+        ),
+    }
+)
+
+
+def _git_env() -> Optional[Mapping[str, str]]:
+    """Get the environment for git commands that talk to a remote."""
+    # Check if we should disable SSH host key checking
+    disable_host_key_checking = os.getenv(
+        "GIT_SIM_SSH_DISABLE_HOST_KEY_CHECKING", "false"
+    ).lower()
+    if disable_host_key_checking in ("true", "1", "yes"):
+        logger.info("SSH host key checking disabled")
+        return _SSH_ENV
+
+    return None
+
+
+async def _deepen_clone(
+    repo_url: str, local_path: str, depth: Optional[int]
+) -> Optional[str]:
+    """Fetch history missing from an earlier shallow clone of a repository.
+
+    Returns:
+        An error message if the fetch failed, None otherwise
+    """
+    key = _repo_key(repo_url)
+    clone = _cloned_repos.get(key)
+    if clone is None or clone.depth is None:
+        return None
+    if depth is None:
+        fetch_args = ["--unshallow"]
+    elif depth > clone.depth:
+        fetch_args = ["--depth", str(depth)]
+    else:
+        return None
+
+    logger.info(f"Fetching more history for {repo_url} into {local_path}")
+    async with _clone_semaphore:
+        # Name the clone with -C rather than cwd, which rules out posix_spawn()
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            "-C",
+            local_path,
+            "fetch",
+            *fetch_args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=_git_env(),
+            **_GIT_SPAWN_OPTIONS,
+        )
+        try:
+            _, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=CLONE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return f"Fetching history timed out after {CLONE_TIMEOUT_SECONDS} seconds"
+
+    if process.returncode != 0:
+        return stderr.decode("utf-8", errors="ignore") or "Fetching history failed"
+
+    _cloned_repos[key] = clone._replace(depth=depth)
+    return None
+
+
+def _repo_key(repo_url: str) -> str:
+    """Get the key under which the clone of a repository URL is stored.
+
+    URLs differing only in surrounding whitespace, a trailing slash or a
+    ".git" suffix name the same repository.
+    """
+    key = repo_url.strip().rstrip("/")
+    if key.endswith(".git"):
+        key = key[: -len(".git")]
+    return key
+
+
+def _record_clone(repo_url: str, local_path: str, depth: Optional[int], partial: bool):
+    """Record a clone of a repository for reuse by later requests."""
+    _cloned_repos[_repo_key(repo_url)] = _Clone(
+        local_path, depth, _repo_host(repo_url), partial
+    )
+    _clone_watcher.watch(local_path)
+
+
+def _repo_host(repo_url: str) -> Optional[str]:
+    """Get the host of a remote repository URL, or None for a local path."""
+    if "://" in repo_url:
+        return urlparse(repo_url).hostname
+    # scp-like syntax: [user@]host:path
+    host, separator, _ = repo_url.partition(":")
+    if separator and "/" not in host and len(host) > 1:
+        return host.rpartition("@")[2]
+    return None
+
+
+def _reference_args(repo_url: str) -> List[str]:
+    """Get git clone arguments to borrow objects from clones of the same host.
+
+    Repositories on the same host (e.g. forks) often share most of their
+    history. Only full-history clones with all file contents are used,
+    since git cannot borrow from shallow ones, nor copy file contents that
+    a partial clone never fetched. The new clone copies the objects it
+    borrows, so it stays valid whatever happens to the other clones.
+    """
+    host = _repo_host(repo_url)
+    args = []
+    if host:
+        for clone in _cloned_repos.values():
+            if clone.host == host and clone.depth is None and not clone.partial:
+                args.extend(["--reference-if-able", clone.local_path])
+    if args:
+        args.append("--dissociate")
+    return args
+
+
+def _use_pygit2(repo_url: str) -> bool:
+    """Check whether to clone a repository in-process with pygit2.
+
+    pygit2 is used only when selected with GIT_SIM_CLONE_BACKEND. SSH URLs
+    are always cloned with git, which honours the SSH configuration.
+    """
+    if os.getenv("GIT_SIM_CLONE_BACKEND", "git").lower() != "pygit2":
+        return False
+    if pygit2 is None:
+        logger.warning("pygit2 is not installed; cloning with git instead")
+        return False
+    is_scp_like = "://" not in repo_url and ":" in repo_url.partition("/")[0]
+    return not (repo_url.startswith("ssh://") or is_scp_like)
+
+
+async def _clone_with_git(cmd: List[str]) -> Tuple[int, str, str]:
+    """Run a git clone command, killing it if it exceeds the timeout."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=_git_env(),
+        **_GIT_SPAWN_OPTIONS,
+    )
+
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(), timeout=CLONE_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+
+    return (
+        process.returncode,
+        stdout.decode("utf-8", errors="ignore"),
+        stderr.decode("utf-8", errors="ignore"),
+    )
+
+
+async def _clone_with_pygit2(
+    repo_url: str, path: str, branch: Optional[str], depth: Optional[int]
+) -> Tuple[int, str, str]:
+    """Clone a repository with libgit2 in a worker thread.
+
+    libgit2 has no partial clone support, and fetches all branches. Clone
+    errors are raised as pygit2.GitError.
+    """
+    cancelled = threading.Event()
+
+    class Callbacks(pygit2.RemoteCallbacks):
+        def transfer_progress(self, stats):
+            # Raising here is the only way to stop libgit2 mid-transfer
+            if cancelled.is_set():
+                raise InterruptedError("Clone cancelled")
+
+    clone = asyncio.ensure_future(
+        asyncio.to_thread(
+            pygit2.clone_repository,
+            repo_url,
+            path,
+            checkout_branch=branch,
+            depth=depth or 0,
+            callbacks=Callbacks(),
+        )
+    )
+    try:
+        await asyncio.wait_for(asyncio.shield(clone), timeout=CLONE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        cancelled.set()
+        await asyncio.wait([clone])
+        raise
+
+    return 0, "", ""
+
+
+async def clone_repo(
+    repo_url: str,
+    branch: Optional[str] = None,
+    depth: Optional[int] = None,
+    single_branch: bool = False,
+    partial: bool = True,
+) -> Dict[str, Any]:
     """
     Clone a repository to a temporary directory.
 
+    If the repository was already cloned with less history than requested,
+    the missing history is fetched into the existing clone.
+
     Args:
         repo_url: The Git repository URL to clone
         branch: Optional branch to checkout after cloning
+        depth: Number of commits of history to fetch, or None for full history
+        single_branch: Only fetch the history of the checked out branch
+        partial: Only fetch file contents when they are first read
 
     Returns:
         Dictionary containing:
@@ -357,10 +823,18 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
     """
     try:
         # Check if already cloned
-        if repo_url in _cloned_repos:
-            local_path = _cloned_repos[repo_url]
-            if os.path.exists(local_path):
+        clone = _cloned_repos.get(_repo_key(repo_url))
+        if clone is not None:
+            local_path = clone.local_path
+            if _clone_watcher.exists(local_path):
                 logger.info(f"Repository already cloned at: {local_path}")
+                error = await _deepen_clone(repo_url, local_path, depth)
+                if error:
+                    return {
+                        "success": False,
+                        "error": error,
+                        "repo_url": repo_url,
+                    }
                 return {
                     "success": True,
                     "local_path": local_path,
@@ -372,8 +846,21 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
         temp_dir = tempfile.mkdtemp(prefix="git-sim-clone-")
         logger.info(f"Cloning {repo_url} to {temp_dir}")
 
-        # Build git clone command
-        cmd = ["git", "clone"]
+        # Build git clone command, without copying hooks and other templates
+        cmd = ["git", "clone", "--template="]
+
+        # Fetch only as much history as requested
+        if depth is not None:
+            cmd.extend(["--depth", str(depth), "--no-tags"])
+        if single_branch:
+            cmd.append("--single-branch")
+
+        # Defer downloading file contents until git-sim reads them
+        if partial:
+            cmd.append("--filter=blob:none")
+
+        # Reuse objects already fetched from the same host
+        cmd.extend(_reference_args(repo_url))
 
         # Add branch if specified
         if branch:
@@ -382,35 +869,16 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
         # Add repo URL and target directory
         cmd.extend([repo_url, temp_dir])
 
-        # Get SSH configuration from environment
-        env = os.environ.copy()
-
-        # Check if we should disable SSH host key checking
-        disable_host_key_checking = os.getenv(
-            "GIT_SIM_SSH_DISABLE_HOST_KEY_CHECKING", "false"
-        ).lower()
-        if disable_host_key_checking in ("true", "1", "yes"):
-            logger.info("SSH host key checking disabled")
-            env["GIT_SSH_COMMAND"] = (
-                "ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
-            )
-
-        # Execute git clone
-        result = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env,
-        )
-
-        # Wait for clone to complete with timeout
+        # Execute the clone with timeout
+        use_pygit2 = _use_pygit2(repo_url)
         try:
-            stdout, stderr = await asyncio.wait_for(
-                result.communicate(), timeout=CLONE_TIMEOUT_SECONDS
-            )
+            async with _clone_semaphore:
+                returncode, stdout_str, stderr_str = await (
+                    _clone_with_pygit2(repo_url, temp_dir, branch, depth)
+                    if use_pygit2
+                    else _clone_with_git(cmd)
+                )
         except asyncio.TimeoutError:
-            result.kill()
-            await result.wait()
             shutil.rmtree(temp_dir, ignore_errors=True)
             return {
                 "success": False,
@@ -418,12 +886,10 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
                 "repo_url": repo_url,
             }
 
-        stdout_str = stdout.decode("utf-8", errors="ignore")
-        stderr_str = stderr.decode("utf-8", errors="ignore")
-
-        if result.returncode == 0:
+        if returncode == 0:
             # Store the cloned repo path
-            _cloned_repos[repo_url] = temp_dir
+            # libgit2 always fetches all file contents
+            _record_clone(repo_url, temp_dir, depth, partial and not use_pygit2)
             logger.info(f"Successfully cloned {repo_url} to {temp_dir}")
 
             return {
@@ -440,7 +906,7 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
                 "success": False,
                 "error": stderr_str or "Clone failed",
                 "repo_url": repo_url,
-                "return_code": result.returncode,
+                "return_code": returncode,
             }
 
     except Exception as e:
@@ -454,13 +920,10 @@ async def clone_repo(repo_url: str, branch: Optional[str] = None) -> Dict[str, A
         }
 
 
-@server.list_tools()
-async def handle_list_tools() -> List[Tool]:
-    """List available tools."""
-    return [
-        Tool(
-            name="clone-repo",
-            description="""Clone a Git repository to a temporary location for the session.
+# The tool definitions never change at runtime, so build them once.
+_CLONE_REPO_TOOL = Tool(
+    name="clone-repo",
+    description="""Clone a Git repository to a temporary location for the session.
 
 This tool is useful when the MCP server is accessed over a network and doesn't have
 direct access to the repository. It clones the repository to a temporary directory
@@ -471,7 +934,12 @@ The cloned repository path can then be used with the 'git-sim' tool's 'repo_path
 USAGE:
 1. Specify 'repo_url' with the Git repository URL (SSH or HTTPS)
 2. Optionally specify 'branch' to checkout a specific branch
-3. The tool returns the local path to the cloned repository
+3. Optionally specify 'depth' to fetch only the latest commits (the full history
+   is fetched by default), and 'single_branch' to fetch only one branch. These
+   make cloning large repositories faster, but git-sim cannot show commits or
+   branches that were not fetched. Cloning a repository again with a larger
+   depth, or none, fetches the missing history into the same clone
+4. The tool returns the local path to the cloned repository
 
 EXAMPLES:
 1. Clone a repository:
@@ -480,16 +948,20 @@ EXAMPLES:
 2. Clone a specific branch:
    {"repo_url": "git@github.com:user/repo.git", "branch": "main"}
 
+3. Clone the last 20 commits of all branches:
+   {"repo_url": "https://github.com/user/repo.git", "depth": 20, "single_branch": false}
+
 ENVIRONMENT VARIABLES:
 - GIT_SIM_SSH_DISABLE_HOST_KEY_CHECKING: Set to 'true' to disable SSH host key checking
   (useful for automated environments with trusted hosts)
 
 NOTE: Cloned repositories are automatically cleaned up when the server stops.""",
-            inputSchema=CLONE_REPO_TOOL_SCHEMA,
-        ),
-        Tool(
-            name="git-sim",
-            description="""Execute git-sim to visualize Git operations.
+    inputSchema=CLONE_REPO_TOOL_SCHEMA,
+)
+
+_GIT_SIM_TOOL = Tool(
+    name="git-sim",
+    description="""Execute git-sim to visualize Git operations.
 
 git-sim generates visual simulations of Git commands as images or videos. This is useful for:
 - Understanding how Git commands work before executing them
@@ -528,16 +1000,39 @@ EXAMPLES:
    {"command": "status"}
 
 The tool returns the path to generated visualization file and command output.""",
-            inputSchema=GIT_SIM_TOOL_SCHEMA,
-        ),
-    ]
+    inputSchema=GIT_SIM_TOOL_SCHEMA,
+)
+
+_TOOLS = (_CLONE_REPO_TOOL, _GIT_SIM_TOOL)
+
+
+# First lines of tool responses, indexed by whether the tool succeeded
+_CLONE_REPO_HEADERS = (
+    "✗ Repository clone failed\n\n",
+    "✓ Repository cloned successfully\n\n",
+)
+_GIT_SIM_HEADERS = (
+    "✗ git-sim {command} failed\n\n",
+    "✓ git-sim {command} executed successfully\n\n",
+)
 
 
-@server.call_tool()
+@server.list_tools()
+async def handle_list_tools() -> List[Tool]:
+    """List available tools."""
+    return list(_TOOLS)
+
+
+@server.call_tool(validate_input=False)
 async def handle_call_tool(
     name: str, arguments: Dict[str, Any]
 ) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
     """Handle tool execution requests."""
+    # Raised errors are reported to the client as tool errors (isError)
+    error = _validate(name, arguments)
+    if error:
+        raise ValueError(error)
+
     if name == "clone-repo":
         return await handle_clone_repo_tool(arguments)
     elif name == "git-sim":
@@ -556,14 +1051,24 @@ async def handle_clone_repo_tool(arguments: Dict[str, Any]) -> Sequence[TextCont
             ]
 
         branch = arguments.get("branch")
+        depth = arguments.get("depth")
+        single_branch = arguments.get("single_branch", False)
+        partial = arguments.get("partial", True)
 
         # Execute the clone
-        result = await clone_repo(repo_url=repo_url, branch=branch)
+        result = await clone_repo(
+            repo_url=repo_url,
+            branch=branch,
+            depth=depth,
+            single_branch=single_branch,
+            partial=partial,
+        )
 
         # Build response
-        if result["success"]:
-            response_text = "✓ Repository cloned successfully\n\n"
-            response_text += f"Repository URL: {result['repo_url']}\n"
+        success = bool(result["success"])
+        response_text = _CLONE_REPO_HEADERS[success]
+        response_text += f"Repository URL: {result['repo_url']}\n"
+        if success:
             response_text += f"Local path: {result['local_path']}\n"
             if result.get("message"):
                 response_text += f"\n{result['message']}\n"
@@ -574,8 +1079,6 @@ async def handle_clone_repo_tool(arguments: Dict[str, Any]) -> Sequence[TextCont
                 f"by setting 'repo_path': '{result['local_path']}'"
             )
         else:
-            response_text = "✗ Repository clone failed\n\n"
-            response_text += f"Repository URL: {result['repo_url']}\n"
             if result.get("error"):
                 response_text += f"\nError:\n{result['error']}\n"
             if result.get("return_code"):
@@ -588,18 +1091,23 @@ async def handle_clone_repo_tool(arguments: Dict[str, Any]) -> Sequence[TextCont
         return [TextContent(type="text", text=f"Error cloning repository: {str(e)}")]
 
 
+def _encode_file(path: str) -> str:
+    """Base64-encode a file.
+
+    The file is encoded straight from a read-only mapping of it, to avoid
+    holding a second copy of it in memory.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return base64.b64encode(mm).decode("ascii")
+
+
 async def handle_git_sim_tool(
     arguments: Dict[str, Any],
 ) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
     """Handle git-sim tool execution."""
     try:
-        # Extract parameters
-        command = arguments.get("command")
-        if not command:
-            return [
-                TextContent(type="text", text="Error: 'command' parameter is required")
-            ]
-
+        # Extract parameters; _validate() has checked that command is given
+        command = arguments["command"]
         args = arguments.get("args", [])
         raw_repo_path = arguments.get("repo_path", ".")
 
@@ -647,18 +1155,8 @@ async def handle_git_sim_tool(
         # Validate extra_flags - only allow whitelisted safe flags
         extra_flags = arguments.get("extra_flags", [])
         if extra_flags:
-            safe_flags = {
-                "--quiet",
-                "-q",
-                "--reverse",
-                "-r",
-                "--all",
-                "--invert-branches",
-                "--hide-merged-branches",
-                "--highlight-commit-messages",
-            }
             for flag in extra_flags:
-                if flag not in safe_flags:
+                if flag not in _SAFE_EXTRA_FLAGS:
                     logger.warning(f"Potentially unsafe extra_flag blocked: {flag}")
                     return [
                         TextContent(
@@ -691,10 +1189,11 @@ async def handle_git_sim_tool(
 
         # Build response
         response_parts = []
+        success = bool(result["success"])
+        header = _GIT_SIM_HEADERS[success].format(command=command)
 
-        if result["success"]:
-            response_text = f"✓ git-sim {command} executed successfully\n\n"
-            response_text += f"Command: {result['command']}\n"
+        if success:
+            response_text = header + f"Command: {result['command']}\n"
 
             if result.get("media_path"):
                 response_text += f"Output file: {result['media_path']}\n"
@@ -706,29 +1205,21 @@ async def handle_git_sim_tool(
 
             # Try to include the image data if it's an image file
             media_path = result.get("media_path")
-            if media_path and Path(media_path).exists():
-                file_ext = Path(media_path).suffix.lower()
-                if file_ext in [".jpg", ".jpeg", ".png"]:
-                    try:
-                        with open(media_path, "rb") as f:
-                            image_data = base64.b64encode(f.read()).decode("utf-8")
-
-                        mime_type = (
-                            "image/jpeg"
-                            if file_ext in [".jpg", ".jpeg"]
-                            else "image/png"
-                        )
-
-                        response_parts.append(
-                            ImageContent(
-                                type="image", data=image_data, mimeType=mime_type
-                            )
-                        )
-                    except Exception as e:
-                        logger.warning(f"Could not read image file: {e}")
+            media_ext = os.path.splitext(media_path)[1].lower() if media_path else ""
+            if (
+                mime_type := _SUFFIX_MIME.get(media_ext)
+            ) is not None and os.path.exists(media_path):
+                try:
+                    # Read in a worker thread to keep the event loop responsive
+                    image_data = await asyncio.to_thread(_encode_file, media_path)
+
+                    response_parts.append(
+                        ImageContent(type="image", data=image_data, mimeType=mime_type)
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not read image file: {e}")
         else:
-            error_text = f"✗ git-sim {command} failed\n\n"
-            error_text += f"Command: {result.get('command', 'unknown')}\n"
+            error_text = header + f"Command: {result.get('command', 'unknown')}\n"
             error_text += f"Return code: {result.get('return_code', 'unknown')}\n"
 
             if result.get("error"):
@@ -746,22 +1237,51 @@ async def handle_git_sim_tool(
         return [TextContent(type="text", text=f"Error executing git-sim: {str(e)}")]
 
 
+# Options sent to every client on initialization, shared by all transports.
+# Built after the handlers above are registered, since they determine the
+# advertised capabilities.
+INITIALIZATION_OPTIONS = InitializationOptions(
+    server_name="git-sim-mcp",
+    server_version=__version__,
+    capabilities=server.get_capabilities(
+        notification_options=NotificationOptions(), experimental_capabilities={}
+    ),
+)
+
+
+def use_pidfd_child_watcher():
+    """Wait for child processes through pidfds on the running event loop.
+
+    Before Python 3.12, asyncio waits for each child process in a thread
+    of its own, unless told to use pidfds (Linux 5.3 and later).
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    loop = asyncio.get_running_loop()
+    if not isinstance(loop, asyncio.SelectorEventLoop):
+        # e.g. uvloop, which waits for child processes itself
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
 async def main():
     """Main entry point for the MCP server."""
     logger.info("Starting git-sim MCP server")
+    use_pidfd_child_watcher()
 
     # Run the server using stdio transport
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+    async with stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
             write_stream,
-            InitializationOptions(
-                server_name="git-sim-mcp",
-                server_version=__version__,
-                capabilities=server.get_capabilities(
-                    notification_options=None, experimental_capabilities={}
-                ),
-            ),
+            INITIALIZATION_OPTIONS,
         )
 
 
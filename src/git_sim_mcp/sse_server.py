@@ -4,6 +4,8 @@ import asyncio
 import json
 import logging
 import os
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 
 from mcp.server.sse import SseServerTransport
 from starlette.applications import Starlette
@@ -13,14 +15,65 @@ from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
 import uvicorn
 
-from git_sim_mcp.server import server
+from git_sim_mcp.server import INITIALIZATION_OPTIONS, server, use_pidfd_child_watcher
 
 logger = logging.getLogger("git-sim-mcp.sse")
 
 
+# Defaults for CORS settings left out of GIT_SIM_CORS_CONFIG
+_CORS_DEFAULTS = {
+    "allow_origins": ["*"],
+    "allow_methods": ["GET", "POST", "OPTIONS"],
+    "allow_headers": ["*"],
+    "allow_credentials": False,
+}
+
+
+# CORS settings that are lists of strings
+_CORS_LIST_KEYS = ("allow_origins", "allow_methods", "allow_headers")
+
+
+def _cors_config_error(config: Any) -> Optional[str]:
+    """Check a decoded GIT_SIM_CORS_CONFIG value, returning what is wrong."""
+    if not isinstance(config, dict):
+        return "not a JSON object"
+    for key in _CORS_LIST_KEYS:
+        value = config.get(key, [])
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            return f"{key} is not a list of strings"
+    if not isinstance(config.get("allow_credentials", False), bool):
+        return "allow_credentials is not a boolean"
+    return None
+
+
 # Get CORS configuration from environment
-def get_cors_config():
-    """Get CORS configuration from environment variables."""
+def get_cors_config() -> Mapping[str, Any]:
+    """Get CORS configuration from environment variables.
+
+    A JSON object in GIT_SIM_CORS_CONFIG takes precedence over all other
+    CORS variables. The returned mapping is read-only.
+    """
+    config_json = os.getenv("GIT_SIM_CORS_CONFIG")
+    if config_json:
+        try:
+            config = json.loads(config_json)
+        except ValueError:
+            logger.warning("Ignoring invalid GIT_SIM_CORS_CONFIG value")
+        else:
+            error = _cors_config_error(config)
+            if error is None:
+                merged = {**_CORS_DEFAULTS, **config}
+                # Copy the lists, so no two configurations share them
+                for key in _CORS_LIST_KEYS:
+                    merged[key] = list(merged[key])
+                return MappingProxyType(merged)
+            logger.warning(f"Ignoring GIT_SIM_CORS_CONFIG: {error}")
+
+    return MappingProxyType(_get_cors_config_from_variables())
+
+
+def _get_cors_config_from_variables() -> Dict[str, Any]:
+    """Get CORS configuration from the individual GIT_SIM_CORS_* variables."""
     # Check for simple accept-all CORS mode
     accept_all = os.getenv("GIT_SIM_CORS_ACCEPT_ALL", "false").lower() in (
         "true",
@@ -68,7 +121,7 @@ async def handle_sse(request):
         await server.run(
             transport.read_stream,
             transport.write_stream,
-            server.create_initialization_options(),
+            INITIALIZATION_OPTIONS,
         )
 
 
@@ -77,17 +130,20 @@ async def handle_messages(request):
     return Response("SSE endpoint", media_type="text/plain")
 
 
+# The health check payload never changes, so serialize it once
+_HEALTH_BODY = json.dumps(
+    {"status": "healthy", "service": "git-sim-mcp", "transport": "sse"}
+).encode("ascii")
+
+
 async def health_check(request):
     """Health check endpoint."""
-    return Response(
-        json.dumps({"status": "healthy", "service": "git-sim-mcp", "transport": "sse"}),
-        media_type="application/json",
-    )
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 
 # Get CORS configuration
 cors_config = get_cors_config()
-logger.info(f"CORS configuration: {cors_config}")
+logger.info(f"CORS configuration: {dict(cors_config)}")
 
 # Create middleware
 middleware = [
@@ -111,9 +167,19 @@ app = Starlette(
 )
 
 
+def run(coro):
+    """Run a coroutine on uvloop when it is installed, else on asyncio's loop."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    return uvloop.run(coro)
+
+
 async def main(host: str = "127.0.0.1", port: int = 8000):
     """Run the SSE server."""
     logger.info(f"Starting git-sim MCP SSE server on {host}:{port}")
+    use_pidfd_child_watcher()
 
     config = uvicorn.Config(app=app, host=host, port=port, log_level="info")
 
@@ -122,4 +188,4 @@ async def main(host: str = "127.0.0.1", port: int = 8000):
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -0,0 +1,226 @@
+"""Persistent git-sim worker processes.
+
+Starting git-sim means starting a Python interpreter and importing manim,
+which takes far longer than rendering a typical image. A worker imports
+git-sim once and then runs commands sent to it over stdin, one JSON frame
+per line, answering each with a JSON frame on stdout:
+
+    request:  {"argv": ["-n", "5", "-d", "log"], "cwd": "/path/to/repo"}
+    response: {"returncode": 0, "stdout": "...", "stderr": "..."}
+
+Run a worker with ``python -m git_sim_mcp.workers``.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import traceback
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, List
+from typing import Sequence, Tuple
+
+logger = logging.getLogger("git-sim-mcp.workers")
+
+# Command used to start a worker process
+WORKER_COMMAND = (sys.executable, "-m", "git_sim_mcp.workers")
+
+# Responses carry the whole command output on one line
+_FRAME_LIMIT = 16 * 1024 * 1024
+
+
+def worker_pool_size() -> int:
+    """Get the number of git-sim workers to run from the environment.
+
+    Returns 0 when persistent workers are disabled. The pool is capped at
+    the number of CPUs, since each worker renders on a single core.
+    """
+    try:
+        size = int(os.getenv("GIT_SIM_WORKERS", "0"))
+    except ValueError:
+        logger.warning("Ignoring invalid GIT_SIM_WORKERS value")
+        return 0
+    return max(0, min(size, os.cpu_count() or 1))
+
+
+class GitSimWorker:
+    """A long-lived git-sim worker process."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @classmethod
+    async def start(cls, command: Sequence[str] = WORKER_COMMAND) -> "GitSimWorker":
+        """Start a new worker process."""
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=_FRAME_LIMIT,
+        )
+        logger.info(f"Started git-sim worker (pid {process.pid})")
+        return cls(process)
+
+    async def run(self, argv: Sequence[str], cwd: str) -> Tuple[int, str, str]:
+        """Run git-sim with the given arguments in the given directory.
+
+        Returns:
+            Tuple of (return code, stdout, stderr)
+        """
+        frame = json.dumps({"argv": list(argv), "cwd": cwd}) + "\n"
+        self.process.stdin.write(frame.encode("utf-8"))
+        await self.process.stdin.drain()
+
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("git-sim worker exited unexpectedly")
+
+        response = json.loads(line)
+        return response["returncode"], response["stdout"], response["stderr"]
+
+    async def stop(self):
+        """Terminate the worker process."""
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+
+
+class GitSimWorkerPool:
+    """A fixed-size pool of git-sim workers, started on first use."""
+
+    def __init__(self, size: int, command: Sequence[str] = WORKER_COMMAND):
+        self.size = size
+        self.command = tuple(command)
+        self._idle: List[GitSimWorker] = []
+        # Each slot holds at most one worker, started when first needed
+        self._slots = asyncio.Semaphore(size)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[GitSimWorker]:
+        """Check out a worker for the duration of one command.
+
+        A worker whose command raised (including on timeout or
+        cancellation) may be mid-frame, so it is killed rather than
+        returned to the pool; its slot starts a replacement when next used.
+        """
+        async with self._slots:
+            if self._idle:
+                worker = self._idle.pop()
+            else:
+                worker = await GitSimWorker.start(self.command)
+
+            try:
+                yield worker
+            except BaseException:
+                await worker.stop()
+                raise
+            else:
+                self._idle.append(worker)
+
+    async def run(self, cmd: Sequence[str], cwd: str) -> Tuple[int, str, str]:
+        """Run a full git-sim command line on a pooled worker."""
+        async with self.acquire() as worker:
+            return await worker.run(cmd[1:], os.path.abspath(cwd))
+
+    async def close(self):
+        """Terminate all idle workers."""
+        while self._idle:
+            await self._idle.pop().stop()
+
+
+def run_command(
+    app: Callable[..., Any],
+    argv: List[str],
+    isolate: Callable[[], ContextManager] = contextlib.nullcontext,
+) -> Dict[str, Any]:
+    """Run one git-sim command in-process, capturing its output."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    returncode = 0
+
+    with isolate(), contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(
+        stderr
+    ):
+        try:
+            result = app(args=argv, prog_name="git-sim", standalone_mode=False)
+            if isinstance(result, int):
+                returncode = result
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                returncode = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except Exception as e:
+            # click reports usage errors through ClickException.show()
+            if hasattr(e, "show") and hasattr(e, "exit_code"):
+                e.show()
+                returncode = e.exit_code
+            else:
+                traceback.print_exc()
+                returncode = 1
+
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def _git_sim_isolation() -> Callable[[], ContextManager]:
+    """Build a context manager that undoes git-sim's global state changes.
+
+    git-sim stores its options in a module-level settings object and in
+    manim's global config, and does not reset every field on each run.
+    """
+    from manim import tempconfig
+    from git_sim.settings import settings
+
+    @contextlib.contextmanager
+    def isolate():
+        saved = settings.model_dump()
+        try:
+            with tempconfig({}):
+                yield
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+
+    return isolate
+
+
+def serve():
+    """Serve git-sim commands read from stdin until it is closed."""
+    # Keep stdout for response frames only; anything else written to file
+    # descriptor 1 (e.g. by native libraries) goes to stderr instead.
+    frames = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    from git_sim.__main__ import app
+
+    isolate = _git_sim_isolation()
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        argv = list(request["argv"])
+        cwd = request["cwd"]
+
+        # git-sim's default media directory is bound when it is imported,
+        # so pin it to the repository like a fresh process would
+        if "--media-dir" not in argv:
+            argv = ["--media-dir", cwd] + argv
+
+        try:
+            os.chdir(cwd)
+        except OSError as e:
+            response = {"returncode": 1, "stdout": "", "stderr": f"{e}\n"}
+        else:
+            response = run_command(app, argv, isolate)
+        frames.write(json.dumps(response) + "\n")
+        frames.flush()
+
+
+if __name__ == "__main__":
+    serve()
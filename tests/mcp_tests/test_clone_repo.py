@@ -1,19 +1,32 @@
 """Tests for clone-repo tool functionality."""
 
+import asyncio
 import pytest
-import tempfile
 import os
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import patch, AsyncMock, Mock
 
 from git_sim_mcp.server import (
     clone_repo,
     handle_clone_repo_tool,
     handle_list_tools,
     _cloned_repos,
+    _clone_watcher,
+    _record_clone,
+    _repo_key,
     cleanup_cloned_repos,
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_clones():
+    """Run every test without clones recorded by other tests."""
+    _cloned_repos.clear()
+    _clone_watcher.clear()
+    yield
+    _cloned_repos.clear()
+    _clone_watcher.clear()
+
+
 @pytest.mark.asyncio
 class TestCloneRepo:
     """Test repository cloning functionality."""
@@ -48,6 +61,8 @@ class TestCloneRepo:
         assert "git" in call_args
         assert "clone" in call_args
         assert "https://github.com/user/repo.git" in call_args
+        assert "--filter=blob:none" in call_args
+        assert "--template=" in call_args
 
     @patch("asyncio.create_subprocess_exec")
     @patch("tempfile.mkdtemp")
@@ -73,6 +88,178 @@ class TestCloneRepo:
         call_args = mock_subprocess.call_args[0]
         assert "-b" in call_args
         assert "develop" in call_args
+        assert "--depth" not in call_args
+        assert "--single-branch" not in call_args
+        assert "--no-tags" not in call_args
+
+    @patch("asyncio.create_subprocess_exec")
+    @patch("tempfile.mkdtemp")
+    async def test_shallow_clone(self, mock_mkdtemp, mock_subprocess):
+        """Test cloning only the latest commit of one branch."""
+        mock_mkdtemp.return_value = "/tmp/git-sim-clone-shallow"
+
+        mock_process = AsyncMock()
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        result = await clone_repo(
+            repo_url="https://github.com/user/shallow.git",
+            depth=1,
+            single_branch=True,
+        )
+
+        assert result["success"] is True
+        call_args = mock_subprocess.call_args[0]
+        assert call_args[call_args.index("--depth") + 1] == "1"
+        assert "--single-branch" in call_args
+        assert "--no-tags" in call_args
+
+    @patch("asyncio.create_subprocess_exec")
+    @patch("os.path.exists")
+    async def test_already_cloned_repo_is_deepened(self, mock_exists, mock_subprocess):
+        """Test that a shallow clone is unshallowed when full history is requested."""
+        repo_url = "https://github.com/user/shallow.git"
+        existing_path = "/tmp/git-sim-clone-shallow"
+
+        _record_clone(repo_url, existing_path, 1, True)
+        mock_exists.return_value = True
+
+        mock_process = AsyncMock()
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        result = await clone_repo(repo_url=repo_url, depth=None)
+
+        assert result["success"] is True
+        assert result["local_path"] == existing_path
+        call_args = mock_subprocess.call_args[0]
+        assert call_args == ("git", "-C", existing_path, "fetch", "--unshallow")
+        assert "cwd" not in mock_subprocess.call_args[1]
+        assert _cloned_repos[_repo_key(repo_url)].depth is None
+
+        # Full history is already there, so nothing more is fetched
+        mock_subprocess.reset_mock()
+        await clone_repo(repo_url=repo_url, depth=10)
+        mock_subprocess.assert_not_called()
+
+    @patch("asyncio.create_subprocess_exec")
+    @patch("tempfile.mkdtemp")
+    async def test_clone_with_pygit2_backend(self, mock_mkdtemp, mock_subprocess):
+        """Test cloning in-process when the pygit2 backend is selected."""
+        temp_dir = "/tmp/git-sim-clone-pygit2"
+        mock_mkdtemp.return_value = temp_dir
+
+        mock_pygit2 = Mock()
+        mock_pygit2.RemoteCallbacks = object
+
+        mock_process = AsyncMock()
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        with patch("git_sim_mcp.server.pygit2", mock_pygit2), patch.dict(
+            os.environ, {"GIT_SIM_CLONE_BACKEND": "pygit2"}
+        ):
+            result = await clone_repo(
+                repo_url="https://github.com/user/repo.git", branch="develop"
+            )
+            # SSH URLs are still cloned with git
+            await clone_repo(repo_url="git@github.com:user/repo.git")
+
+        assert result["success"] is True
+        assert result["local_path"] == temp_dir
+        call = mock_pygit2.clone_repository.call_args
+        assert call[0] == ("https://github.com/user/repo.git", temp_dir)
+        assert call[1]["checkout_branch"] == "develop"
+        assert call[1]["depth"] == 0
+        mock_pygit2.clone_repository.assert_called_once()
+        mock_subprocess.assert_called_once()
+
+    @patch("asyncio.create_subprocess_exec")
+    @patch("tempfile.mkdtemp")
+    async def test_clone_borrows_objects_from_same_host(
+        self, mock_mkdtemp, mock_subprocess
+    ):
+        """Test that full clones from the same host are used as references."""
+        mock_process = AsyncMock()
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        mock_mkdtemp.return_value = "/tmp/git-sim-clone-upstream"
+        await clone_repo(repo_url="https://github.com/user/repo.git", partial=False)
+        assert "--reference-if-able" not in mock_subprocess.call_args[0]
+
+        mock_mkdtemp.return_value = "/tmp/git-sim-clone-fork"
+        await clone_repo(repo_url="git@github.com:fork/repo.git", depth=1)
+        call_args = mock_subprocess.call_args[0]
+        index = call_args.index("--reference-if-able")
+        assert call_args[index + 1] == "/tmp/git-sim-clone-upstream"
+        assert "--dissociate" in call_args
+
+        # Other hosts and shallow clones are not used as references
+        await clone_repo(repo_url="https://gitlab.com/user/repo.git")
+        assert "--reference-if-able" not in mock_subprocess.call_args[0]
+        await clone_repo(repo_url="https://github.com/other/repo.git")
+        call_args = mock_subprocess.call_args[0]
+        assert call_args.count("--reference-if-able") == 1
+        cleanup_cloned_repos()
+
+    @patch("asyncio.create_subprocess_exec")
+    @patch("tempfile.mkdtemp")
+    async def test_clone_does_not_borrow_from_partial_clones(
+        self, mock_mkdtemp, mock_subprocess
+    ):
+        """Test that partial clones lack the file contents to lend."""
+        mock_process = AsyncMock()
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        mock_mkdtemp.return_value = "/tmp/git-sim-clone-partial"
+        await clone_repo(repo_url="https://github.com/user/repo.git")
+        assert "--filter=blob:none" in mock_subprocess.call_args[0]
+
+        mock_mkdtemp.return_value = "/tmp/git-sim-clone-full"
+        await clone_repo(repo_url="https://github.com/other/repo.git", partial=False)
+        call_args = mock_subprocess.call_args[0]
+        assert "--reference-if-able" not in call_args
+        assert "--dissociate" not in call_args
+        cleanup_cloned_repos()
+
+    async def test_concurrent_clones_are_limited(self):
+        """Test that no more clones run at once than the semaphore allows."""
+        running = 0
+        peak = 0
+
+        async def communicate():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return b"", b""
+
+        async def create_process(*args, **kwargs):
+            process = AsyncMock()
+            process.communicate = communicate
+            process.returncode = 0
+            return process
+
+        with patch("asyncio.create_subprocess_exec", side_effect=create_process), patch(
+            "tempfile.mkdtemp", return_value="/tmp/git-sim-clone-concurrent"
+        ), patch("git_sim_mcp.server._clone_semaphore", asyncio.Semaphore(2)):
+            results = await asyncio.gather(
+                *(
+                    clone_repo(repo_url=f"https://github.com/user/repo{i}.git")
+                    for i in range(5)
+                )
+            )
+
+        assert all(r["success"] for r in results)
+        assert peak == 2
 
     @patch("asyncio.create_subprocess_exec")
     @patch("tempfile.mkdtemp")
@@ -103,8 +290,7 @@ class TestCloneRepo:
         repo_url = "https://github.com/user/repo.git"
         existing_path = "/tmp/git-sim-clone-existing"
         
-        _cloned_repos.clear()
-        _cloned_repos[repo_url] = existing_path
+        _record_clone(repo_url, existing_path, None, True)
         mock_exists.return_value = True
 
         result = await clone_repo(repo_url=repo_url)
@@ -116,9 +302,11 @@ class TestCloneRepo:
         
         # Git clone should not be called
         mock_subprocess.assert_not_called()
-        
-        # Cleanup
-        _cloned_repos.clear()
+
+        # Nor for another spelling of the same URL
+        result = await clone_repo(repo_url=" https://github.com/user/repo/ ")
+        assert result["local_path"] == existing_path
+        mock_subprocess.assert_not_called()
 
     @patch("os.getenv")
     @patch("asyncio.create_subprocess_exec")
@@ -239,9 +427,8 @@ class TestCleanup:
     @patch("os.path.exists")
     def test_cleanup_cloned_repos(self, mock_exists, mock_rmtree):
         """Test that cleanup removes all cloned repos."""
-        _cloned_repos.clear()
-        _cloned_repos["https://github.com/user/repo1.git"] = "/tmp/repo1"
-        _cloned_repos["https://github.com/user/repo2.git"] = "/tmp/repo2"
+        _record_clone("https://github.com/user/repo1.git", "/tmp/repo1", 1, True)
+        _record_clone("https://github.com/user/repo2.git", "/tmp/repo2", 1, True)
         
         mock_exists.return_value = True
 
@@ -1,5 +1,6 @@
 """Integration tests for git-sim MCP server with actual git-sim commands."""
 
+import os
 import pytest
 import tempfile
 import shutil
@@ -11,58 +12,104 @@ from git_sim_mcp.server import execute_git_sim, build_git_sim_command
 pytestmark = pytest.mark.integration
 
 
-@pytest.fixture
+# Environment for the git commands setting up test repositories, built once.
+# The user's and system's git configuration and templates are not read.
+GIT_ENV = {
+    **os.environ,
+    "GIT_CONFIG_GLOBAL": os.devnull,
+    "GIT_CONFIG_SYSTEM": os.devnull,
+    "GIT_TEMPLATE_DIR": "",
+}
+
+# Commits of the test repository: (message, content of test.txt)
+COMMITS = [("Initial commit", "Initial content\n")] + [
+    (f"Commit {i+1}", f"Content {i+1}\n") for i in range(3)
+]
+
+
+def fast_import_stream(branch):
+    """Build a git fast-import stream creating all test commits on a branch."""
+    stream = []
+    for i, (message, content) in enumerate(COMMITS):
+        identity = f"Test User <test@example.com> {1700000000 + i} +0000"
+        stream.append(
+            f"commit refs/heads/{branch}\n"
+            f"author {identity}\n"
+            f"committer {identity}\n"
+            f"data {len(message.encode())}\n{message}\n"
+            f"M 100644 inline test.txt\n"
+            f"data {len(content.encode())}\n{content}\n"
+        )
+    return "".join(stream).encode()
+
+
+@pytest.fixture(scope="session")
 def temp_git_repo():
-    """Create a temporary git repository for testing."""
+    """Create a temporary git repository shared by all tests.
+
+    Tests must not modify it; use temp_git_worktree instead.
+    """
     temp_dir = tempfile.mkdtemp()
 
     # Initialize git repo
-    subprocess.run(["git", "init"], cwd=temp_dir, check=True, capture_output=True)
     subprocess.run(
-        ["git", "config", "user.name", "Test User"],
+        ["git", "init", "-b", "main"],
         cwd=temp_dir,
         check=True,
         capture_output=True,
+        env=GIT_ENV,
     )
+    with open(Path(temp_dir) / ".git" / "config", "a") as config:
+        config.write("[user]\n\tname = Test User\n\temail = test@example.com\n")
+
+    # Create all commits in a single git process, then check out the result
     subprocess.run(
-        ["git", "config", "user.email", "test@example.com"],
+        ["git", "fast-import", "--quiet"],
         cwd=temp_dir,
+        input=fast_import_stream("main"),
         check=True,
         capture_output=True,
-    )
-
-    # Create initial commit
-    test_file = Path(temp_dir) / "test.txt"
-    test_file.write_text("Initial content\n")
-    subprocess.run(
-        ["git", "add", "test.txt"], cwd=temp_dir, check=True, capture_output=True
+        env=GIT_ENV,
     )
     subprocess.run(
-        ["git", "commit", "-m", "Initial commit"],
+        ["git", "reset", "--hard", "--quiet"],
         cwd=temp_dir,
         check=True,
         capture_output=True,
+        env=GIT_ENV,
     )
 
-    # Create a few more commits
-    for i in range(3):
-        test_file.write_text(f"Content {i+1}\n")
-        subprocess.run(
-            ["git", "add", "test.txt"], cwd=temp_dir, check=True, capture_output=True
-        )
-        subprocess.run(
-            ["git", "commit", "-m", f"Commit {i+1}"],
-            cwd=temp_dir,
-            check=True,
-            capture_output=True,
-        )
-
     yield temp_dir
 
     # Cleanup
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
+@pytest.fixture
+def temp_git_worktree(temp_git_repo):
+    """Check out the shared test repository into a worktree tests may modify."""
+    temp_dir = tempfile.mkdtemp()
+    worktree = str(Path(temp_dir) / "worktree")
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", worktree, "HEAD"],
+        cwd=temp_git_repo,
+        check=True,
+        capture_output=True,
+        env=GIT_ENV,
+    )
+
+    yield worktree
+
+    # Cleanup
+    subprocess.run(
+        ["git", "worktree", "remove", "--force", worktree],
+        cwd=temp_git_repo,
+        capture_output=True,
+        env=GIT_ENV,
+    )
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 @pytest.mark.asyncio
 @pytest.mark.skipif(shutil.which("git-sim") is None, reason="git-sim not installed")
 class TestIntegration:
@@ -84,14 +131,14 @@ class TestIntegration:
                 "media_path"
             ].endswith(".png")
 
-    async def test_execute_status_command(self, temp_git_repo):
+    async def test_execute_status_command(self, temp_git_worktree):
         """Test executing git-sim status command."""
         # Create a modified file
-        test_file = Path(temp_git_repo) / "test.txt"
+        test_file = Path(temp_git_worktree) / "test.txt"
         test_file.write_text("Modified content\n")
 
         result = await execute_git_sim(
-            command="status", repo_path=temp_git_repo, output_only_path=True
+            command="status", repo_path=temp_git_worktree, output_only_path=True
         )
 
         assert result["success"] is True
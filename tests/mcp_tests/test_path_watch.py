@@ -0,0 +1,85 @@
+"""Tests for tracking whether cloned repositories still exist."""
+
+import asyncio
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from git_sim_mcp import _path_watch
+from git_sim_mcp._path_watch import PathWatcher
+
+
+async def settle():
+    """Give the event loop a chance to process pending notifications."""
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    _path_watch.inotify_simple is None, reason="inotify_simple not installed"
+)
+class TestPathWatcher:
+    """Test watching directories through inotify."""
+
+    async def test_watched_directory_needs_no_stat(self, tmp_path):
+        """Test that watched directories are known to exist without a stat."""
+        watcher = PathWatcher()
+        watcher.watch(str(tmp_path))
+        try:
+            with patch("os.path.exists") as mock_exists:
+                assert watcher.exists(str(tmp_path))
+            mock_exists.assert_not_called()
+        finally:
+            watcher.clear()
+
+    async def test_removed_directories_are_noticed(self, tmp_path):
+        """Test that deleted and moved directories no longer exist."""
+        deleted = tmp_path / "deleted"
+        moved = tmp_path / "moved"
+        deleted.mkdir()
+        moved.mkdir()
+        watcher = PathWatcher()
+        watcher.watch(str(deleted))
+        watcher.watch(str(moved))
+        try:
+            shutil.rmtree(deleted)
+            os.rename(moved, tmp_path / "elsewhere")
+            await settle()
+
+            assert not watcher.exists(str(deleted))
+            assert not watcher.exists(str(moved))
+        finally:
+            watcher.clear()
+
+    async def test_removal_is_noticed_before_the_loop_runs(self, tmp_path):
+        """Test that a directory deleted just before the check is not reported."""
+        watcher = PathWatcher()
+        watcher.watch(str(tmp_path))
+        try:
+            tmp_path.rmdir()
+            assert not watcher.exists(str(tmp_path))
+        finally:
+            watcher.clear()
+
+    async def test_missing_directory_falls_back_to_stat(self, tmp_path):
+        """Test that directories that cannot be watched are checked with a stat."""
+        watcher = PathWatcher()
+        watcher.watch(str(tmp_path / "missing"))
+        try:
+            assert not watcher.exists(str(tmp_path / "missing"))
+        finally:
+            watcher.clear()
+
+
+def test_without_inotify_uses_stat(tmp_path, monkeypatch):
+    """Test that directories are checked with a stat without inotify_simple."""
+    monkeypatch.setattr(_path_watch, "inotify_simple", None)
+    watcher = PathWatcher()
+    watcher.watch(str(tmp_path))
+
+    assert watcher.exists(str(tmp_path))
+    tmp_path.rmdir()
+    assert not watcher.exists(str(tmp_path))
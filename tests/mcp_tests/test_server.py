@@ -1,7 +1,12 @@
 """Tests for git-sim MCP server."""
 
+import asyncio
+import base64
+import sys
+
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import patch, AsyncMock
+from mcp.types import CallToolRequest, CallToolRequestParams
 
 # Import MCP server components
 from git_sim_mcp.server import (
@@ -9,7 +14,14 @@ from git_sim_mcp.server import (
     execute_git_sim,
     handle_list_tools,
     handle_call_tool,
+    INITIALIZATION_OPTIONS,
+    OUTPUT_TAIL_LINES,
+    _communicate_tail,
+    _concurrency_limit,
+    _spawn_options,
+    server,
 )
+from git_sim_mcp import __version__
 
 
 class TestBuildGitSimCommand:
@@ -78,6 +90,56 @@ class TestBuildGitSimCommand:
         assert "--quiet" in cmd
         assert "--reverse" in cmd
 
+    def test_command_is_tuple(self):
+        """Test that the command is built as an immutable tuple."""
+        cmd = build_git_sim_command(command="merge", args=["feature-branch"])
+
+        assert isinstance(cmd, tuple)
+        assert cmd[-2:] == ("merge", "feature-branch")
+
+    def test_repeated_command_is_reused(self):
+        """Test that identical calls share one cached command tuple."""
+        first = build_git_sim_command(command="log", args=["main"], n=4)
+        second = build_git_sim_command(command="log", args=["main"], n=4)
+
+        assert first is second
+        assert build_git_sim_command(command="log", args=["dev"], n=4) is not first
+
+    def test_command_argument_order(self):
+        """Test that global options precede extra flags, subcommand and args."""
+        cmd = build_git_sim_command(
+            command="merge", args=["dev"], n=3, extra_flags=["--quiet"]
+        )
+
+        assert list(cmd) == [
+            "git-sim",
+            "-n",
+            "3",
+            "--img-format",
+            "jpg",
+            "-d",
+            "--quiet",
+            "merge",
+            "dev",
+        ]
+
+
+def fake_process(stdout, stderr=b"", returncode=0):
+    """Build a create_subprocess_exec stand-in streaming the given output."""
+
+    async def create_process(*args, **kwargs):
+        process = AsyncMock()
+        process.stdout.readline = AsyncMock(
+            side_effect=stdout.splitlines(keepends=True) + [b""]
+        )
+        process.stderr.readline = AsyncMock(
+            side_effect=stderr.splitlines(keepends=True) + [b""]
+        )
+        process.returncode = returncode
+        return process
+
+    return create_process
+
 
 @pytest.mark.asyncio
 class TestExecuteGitSim:
@@ -88,9 +150,10 @@ class TestExecuteGitSim:
         """Test successful git-sim execution."""
         # Mock the subprocess
         mock_process = AsyncMock()
-        mock_process.communicate = AsyncMock(
-            return_value=(b"/path/to/output.jpg\n", b"")
+        mock_process.stdout.readline = AsyncMock(
+            side_effect=[b"/path/to/output.jpg\n", b""]
         )
+        mock_process.stderr.readline = AsyncMock(return_value=b"")
         mock_process.returncode = 0
         mock_subprocess.return_value = mock_process
 
@@ -100,16 +163,91 @@ class TestExecuteGitSim:
         assert result["return_code"] == 0
         assert result["error"] is None or result["error"] == ""
 
+    @patch("asyncio.create_subprocess_exec")
+    async def test_media_path_from_verbose_output(self, mock_subprocess, tmp_path):
+        """Test that the media path is found in regular git-sim output."""
+        media_file = tmp_path / "git-sim-log.jpg"
+        media_file.write_bytes(b"")
+
+        mock_subprocess.side_effect = fake_process(
+            f"Simulating: log\nOutput image location: {media_file}\n".encode()
+        )
+
+        result = await execute_git_sim(command="log")
+
+        assert result["success"] is True
+        assert result["media_path"] == str(media_file)
+
+    @patch("asyncio.create_subprocess_exec")
+    async def test_command_is_shell_quoted(self, mock_subprocess):
+        """Test that the reported command line is quoted like a shell command."""
+        mock_subprocess.side_effect = fake_process(b"")
+
+        result = await execute_git_sim(command="commit", args=["-m", "Add a file"])
+
+        assert result["command"].endswith("commit -m 'Add a file'")
+
+    @patch("asyncio.create_subprocess_exec")
+    async def test_only_stdout_tail_is_kept(self, mock_subprocess, tmp_path):
+        """Test that long progress output is cut down to its tail."""
+        media_file = tmp_path / "git-sim-log.mp4"
+        media_file.write_bytes(b"")
+
+        mock_subprocess.side_effect = fake_process(
+            b"Animation 0: 50%\n" * 10000
+            + f"Output video location: {media_file}\n".encode()
+        )
+
+        result = await execute_git_sim(command="log", animate=True)
+
+        assert result["output"].count("\n") == OUTPUT_TAIL_LINES
+        assert result["media_path"] == str(media_file)
+
+    async def test_overlong_output_lines_are_skipped(self, tmp_path):
+        """Test that lines longer than the stream limit do not stop the drain."""
+        media_file = tmp_path / "git-sim-log.jpg"
+        media_file.write_bytes(b"")
+
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            f"print('#' * 200000); print('Output image location: {media_file}')",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=1024,
+        )
+        stdout, _ = await _communicate_tail(process, OUTPUT_TAIL_LINES)
+
+        assert stdout.decode().endswith(f"Output image location: {media_file}\n")
+        assert len(stdout) < 2048
+
+    @patch("asyncio.create_subprocess_exec")
+    async def test_output_only_path_keeps_last_line(self, mock_subprocess, tmp_path):
+        """Test that only the final stdout line is kept with output_only_path."""
+        media_file = tmp_path / "git-sim-log.jpg"
+        media_file.write_bytes(b"")
+
+        mock_process = AsyncMock()
+        mock_process.stdout.readline = AsyncMock(
+            side_effect=[b"progress 50%\n", f"{media_file}\n".encode(), b"\n", b""]
+        )
+        mock_process.stderr.readline = AsyncMock(return_value=b"")
+        mock_process.returncode = 0
+        mock_subprocess.return_value = mock_process
+
+        result = await execute_git_sim(command="log", output_only_path=True)
+
+        assert result["output"] == f"{media_file}\n"
+        assert result["media_path"] == str(media_file)
+        mock_process.communicate.assert_not_called()
+
     @patch("asyncio.create_subprocess_exec")
     async def test_failed_execution(self, mock_subprocess):
         """Test failed git-sim execution."""
         # Mock the subprocess
-        mock_process = AsyncMock()
-        mock_process.communicate = AsyncMock(
-            return_value=(b"", b"Error: Invalid command\n")
+        mock_subprocess.side_effect = fake_process(
+            b"", b"Error: Invalid command\n", returncode=1
         )
-        mock_process.returncode = 1
-        mock_subprocess.return_value = mock_process
 
         result = await execute_git_sim(command="invalid")
 
@@ -121,9 +259,10 @@ class TestExecuteGitSim:
     async def test_execution_with_repo_path(self, mock_subprocess):
         """Test execution with custom repo path."""
         mock_process = AsyncMock()
-        mock_process.communicate = AsyncMock(
-            return_value=(b"/path/to/output.jpg\n", b"")
+        mock_process.stdout.readline = AsyncMock(
+            side_effect=[b"/path/to/output.jpg\n", b""]
         )
+        mock_process.stderr.readline = AsyncMock(return_value=b"")
         mock_process.returncode = 0
         mock_subprocess.return_value = mock_process
 
@@ -137,6 +276,60 @@ class TestExecuteGitSim:
         call_kwargs = mock_subprocess.call_args[1]
         assert call_kwargs["cwd"] == "/tmp/test-repo"
 
+    async def test_concurrent_executions_are_limited(self):
+        """Test that no more git-sim processes run than the semaphore allows."""
+        running = 0
+        peak = 0
+
+        async def wait():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 0
+
+        async def create_process(*args, **kwargs):
+            process = AsyncMock()
+            process.stdout.readline = AsyncMock(return_value=b"")
+            process.stderr.readline = AsyncMock(return_value=b"")
+            process.wait = wait
+            process.returncode = 0
+            return process
+
+        with patch("asyncio.create_subprocess_exec", side_effect=create_process), patch(
+            "git_sim_mcp.server._execute_semaphore", asyncio.Semaphore(2)
+        ):
+            results = await asyncio.gather(
+                *(execute_git_sim(command="log") for _ in range(5))
+            )
+
+        assert all(r["success"] for r in results)
+        assert peak == 2
+
+    async def test_concurrency_limit(self, monkeypatch):
+        """Test that concurrency limits are validated and at least 1."""
+        monkeypatch.delenv("GIT_SIM_MAX_CONCURRENCY", raising=False)
+        assert _concurrency_limit("GIT_SIM_MAX_CONCURRENCY", 3) == 3
+
+        for value, expected in (("8", 8), ("0", 1), ("-2", 1), ("many", 3)):
+            monkeypatch.setenv("GIT_SIM_MAX_CONCURRENCY", value)
+            assert _concurrency_limit("GIT_SIM_MAX_CONCURRENCY", 3) == expected
+
+
+class TestSpawnOptions:
+    """Test the options for starting child processes."""
+
+    def test_spawn_options(self, monkeypatch):
+        """Test that GIT_SIM_SPAWN selects how child processes are started."""
+        monkeypatch.delenv("GIT_SIM_SPAWN", raising=False)
+        options = _spawn_options(sys.executable)
+        assert options == {"close_fds": False, "executable": sys.executable}
+        assert _spawn_options("git-sim-no-such-program") == {}
+
+        monkeypatch.setenv("GIT_SIM_SPAWN", "fork")
+        assert _spawn_options(sys.executable) == {}
+
 
 @pytest.mark.asyncio
 class TestToolHandlers:
@@ -150,16 +343,25 @@ class TestToolHandlers:
         tool_names = [t.name for t in tools]
         assert "clone-repo" in tool_names
         assert "git-sim" in tool_names
-        
+
         # Find the git-sim tool
         git_sim_tool = next(t for t in tools if t.name == "git-sim")
         assert "visualize" in git_sim_tool.description.lower()
         assert git_sim_tool.inputSchema is not None
 
+        # The tool definitions are built once
+        assert all(a is b for a, b in zip(tools, await handle_list_tools()))
+
+    async def test_initialization_options_advertise_tools(self):
+        """Test that the shared initialization options advertise the tools."""
+        assert INITIALIZATION_OPTIONS.server_name == "git-sim-mcp"
+        assert INITIALIZATION_OPTIONS.server_version == __version__
+        assert INITIALIZATION_OPTIONS.capabilities.tools is not None
+
     async def test_tool_schema_has_required_fields(self):
         """Test that tool schema includes all required fields."""
         tools = await handle_list_tools()
-        
+
         # Find the git-sim tool
         git_sim_tool = next(t for t in tools if t.name == "git-sim")
         schema = git_sim_tool.inputSchema
@@ -172,7 +374,7 @@ class TestToolHandlers:
     async def test_tool_schema_has_all_commands(self):
         """Test that tool schema includes all git-sim commands."""
         tools = await handle_list_tools()
-        
+
         # Find the git-sim tool
         git_sim_tool = next(t for t in tools if t.name == "git-sim")
         schema = git_sim_tool.inputSchema
@@ -248,12 +450,31 @@ class TestToolHandlers:
 
     async def test_call_tool_missing_command(self):
         """Test tool call without required command parameter."""
-        result = await handle_call_tool(name="git-sim", arguments={})
+        with pytest.raises(ValueError, match="required"):
+            await handle_call_tool(name="git-sim", arguments={})
+
+    async def test_call_tool_invalid_command(self):
+        """Test tool call with a command git-sim does not support."""
+        with pytest.raises(ValueError, match="bisect"):
+            await handle_call_tool(name="git-sim", arguments={"command": "bisect"})
+
+    async def test_call_tool_invalid_arguments(self):
+        """Test tool call with arguments that do not match the schema."""
+        with pytest.raises(ValueError, match="integer"):
+            await handle_call_tool(
+                name="git-sim", arguments={"command": "log", "n": "ten"}
+            )
+
+    async def test_call_tool_invalid_arguments_are_tool_errors(self):
+        """Test that clients see invalid arguments as a tool error."""
+        request = CallToolRequest(
+            method="tools/call",
+            params=CallToolRequestParams(name="git-sim", arguments={"n": 5}),
+        )
+        result = await server.request_handlers[CallToolRequest](request)
 
-        assert len(result) > 0
-        assert result[0].type == "text"
-        assert "error" in result[0].text.lower()
-        assert "required" in result[0].text.lower()
+        assert result.root.isError is True
+        assert "required" in result.root.content[0].text
 
     async def test_call_tool_unknown_tool(self):
         """Test calling an unknown tool."""
@@ -306,17 +527,13 @@ class TestImageHandling:
     """Test image data handling."""
 
     @patch("git_sim_mcp.server.execute_git_sim")
-    @patch("pathlib.Path.exists")
-    @patch("builtins.open")
-    async def test_image_embedding(self, mock_open, mock_exists, mock_execute):
+    @patch("os.path.exists")
+    @patch("git_sim_mcp.server._encode_file")
+    async def test_image_embedding(self, mock_encode, mock_exists, mock_execute):
         """Test that images are embedded in response."""
         # Mock file existence and reading
         mock_exists.return_value = True
-        mock_file = Mock()
-        mock_file.read.return_value = b"fake_image_data"
-        mock_file.__enter__ = Mock(return_value=mock_file)
-        mock_file.__exit__ = Mock(return_value=False)
-        mock_open.return_value = mock_file
+        mock_encode.return_value = "ZmFrZV9pbWFnZV9kYXRh"
 
         mock_execute.return_value = {
             "success": True,
@@ -330,13 +547,36 @@ class TestImageHandling:
         result = await handle_call_tool(name="git-sim", arguments={"command": "log"})
 
         # Should have both text and image content
-        assert len(result) >= 1
         text_content = [r for r in result if r.type == "text"]
         image_content = [r for r in result if r.type == "image"]
 
         assert len(text_content) > 0
-        # Image embedding might not work in test environment, so we just check structure
-        assert len(image_content) >= 0
+        assert len(image_content) == 1
+        assert image_content[0].data == "ZmFrZV9pbWFnZV9kYXRh"
+        assert image_content[0].mimeType == "image/jpeg"
+        mock_encode.assert_called_once_with("/tmp/output.jpg")
+
+    @patch("git_sim_mcp.server.execute_git_sim")
+    async def test_image_data_is_base64_encoded(self, mock_execute, tmp_path):
+        """Test that the embedded image data matches the file contents."""
+        image_file = tmp_path / "output.png"
+        image_file.write_bytes(b"\x89PNG fake image data")
+
+        mock_execute.return_value = {
+            "success": True,
+            "output": "",
+            "error": None,
+            "command": "git-sim log",
+            "return_code": 0,
+            "media_path": str(image_file),
+        }
+
+        result = await handle_call_tool(name="git-sim", arguments={"command": "log"})
+
+        image_content = [r for r in result if r.type == "image"]
+        assert len(image_content) == 1
+        assert image_content[0].mimeType == "image/png"
+        assert base64.b64decode(image_content[0].data) == image_file.read_bytes()
 
 
 if __name__ == "__main__":
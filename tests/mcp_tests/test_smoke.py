@@ -1,63 +1,80 @@
 """Smoke tests for MCP server - basic functionality checks."""
 
+import contextlib
+import io
+import re
 import subprocess
 import sys
 from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
 
 # Import version for validation
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
 from git_sim_mcp import __version__
+from git_sim_mcp.__main__ import main
+
+
+def run_main(argv):
+    """Run the CLI in-process, returning its exit code and stdout."""
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout), pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    return exit_info.value.code, stdout.getvalue()
 
 
 def test_server_import():
     """Test that the server module can be imported."""
-    result = subprocess.run(
-        [sys.executable, "-c", "from git_sim_mcp import server; print('OK')"],
-        cwd=Path(__file__).parent.parent.parent,
-        env={"PYTHONPATH": str(Path(__file__).parent.parent.parent / "src")},
-        capture_output=True,
-        text=True,
-    )
+    from git_sim_mcp import server
 
-    assert result.returncode == 0, f"Import failed: {result.stderr}"
-    assert "OK" in result.stdout
+    assert server.server is not None
 
 
 def test_server_version():
-    """Test that the server version can be retrieved."""
-    result = subprocess.run(
-        [
-            sys.executable,
-            "-c",
-            "from git_sim_mcp import __version__; print(__version__)",
-        ],
-        cwd=Path(__file__).parent.parent.parent,
-        env={"PYTHONPATH": str(Path(__file__).parent.parent.parent / "src")},
-        capture_output=True,
-        text=True,
-    )
-
-    assert result.returncode == 0, f"Version check failed: {result.stderr}"
-    assert __version__ in result.stdout
+    """Test that the server version is a valid version string."""
+    assert re.match(r"^\d+\.\d+\.\d+", __version__)
 
 
 def test_help_output():
     """Test that help output works."""
-    result = subprocess.run(
-        [sys.executable, "-m", "git_sim_mcp", "--help"],
-        cwd=Path(__file__).parent.parent.parent,
-        env={"PYTHONPATH": str(Path(__file__).parent.parent.parent / "src")},
-        capture_output=True,
-        text=True,
-    )
+    code, output = run_main(["--help"])
 
-    assert result.returncode == 0, f"Help failed: {result.stderr}"
-    assert "git-sim MCP Server" in result.stdout
-    assert "--transport" in result.stdout
+    assert code == 0
+    assert "git-sim MCP Server" in output
+    assert "--transport" in output
 
 
 def test_version_output():
     """Test that version output works."""
+    code, output = run_main(["--version"])
+
+    assert code == 0
+    assert __version__ in output
+
+
+def test_sse_on_loopback_warns(caplog):
+    """Test that serving SSE on loopback suggests the stdio transport."""
+    with patch(
+        "git_sim_mcp.sse_server.main", new_callable=Mock
+    ) as mock_sse_main, patch("git_sim_mcp.sse_server.run") as mock_run:
+        main(["--transport", "sse"])
+
+    mock_sse_main.assert_called_once_with(host="127.0.0.1", port=8000)
+    mock_run.assert_called_once_with(mock_sse_main.return_value)
+    assert "consider --transport stdio" in caplog.text
+
+
+def test_version_output_does_not_warn(caplog):
+    """Test that --version exits before any transport warning."""
+    code, _ = run_main(["--version", "--transport", "sse"])
+
+    assert code == 0
+    assert "consider --transport stdio" not in caplog.text
+
+
+def test_module_entry_point():
+    """Test that the package runs as a module in a fresh interpreter."""
     result = subprocess.run(
         [sys.executable, "-m", "git_sim_mcp", "--version"],
         cwd=Path(__file__).parent.parent.parent,
@@ -71,6 +88,4 @@ def test_version_output():
 
 
 if __name__ == "__main__":
-    import pytest
-
     pytest.main([__file__, "-v"])
@@ -1,9 +1,14 @@
 """Tests for SSE server CORS configuration."""
 
 import os
+import sys
 from unittest.mock import patch
 
-from git_sim_mcp.sse_server import get_cors_config
+import pytest
+
+from starlette.testclient import TestClient
+
+from git_sim_mcp.sse_server import app, get_cors_config, run
 
 
 class TestCORSConfiguration:
@@ -107,7 +112,85 @@ class TestCORSConfiguration:
             
             assert config["allow_origins"] == ["*"]
 
+    def test_json_cors_config(self):
+        """Test that GIT_SIM_CORS_CONFIG overrides the individual settings."""
+        with patch.dict(os.environ, {
+            "GIT_SIM_CORS_CONFIG": '{"allow_origins": ["https://example.com"], "allow_credentials": true}',
+            "GIT_SIM_CORS_ACCEPT_ALL": "true",
+        }):
+            config = get_cors_config()
+
+            assert config["allow_origins"] == ["https://example.com"]
+            assert config["allow_methods"] == ["GET", "POST", "OPTIONS"]
+            assert config["allow_headers"] == ["*"]
+            assert config["allow_credentials"] is True
+
+    def test_invalid_json_cors_config_is_ignored(self):
+        """Test that an invalid GIT_SIM_CORS_CONFIG falls back to the other settings."""
+        with patch.dict(os.environ, {
+            "GIT_SIM_CORS_CONFIG": "not json",
+            "GIT_SIM_CORS_ALLOW_ORIGINS": "https://example.com",
+        }):
+            config = get_cors_config()
+
+            assert config["allow_origins"] == ["https://example.com"]
+
+    def test_json_cors_config_with_bare_string_is_ignored(self):
+        """Test that GIT_SIM_CORS_CONFIG lists must be JSON lists of strings."""
+        with patch.dict(os.environ, {
+            "GIT_SIM_CORS_CONFIG": '{"allow_origins": "https://example.com"}',
+            "GIT_SIM_CORS_ALLOW_ORIGINS": "https://other.example.com",
+        }):
+            config = get_cors_config()
+
+            assert config["allow_origins"] == ["https://other.example.com"]
+
+    def test_json_cors_configs_do_not_share_lists(self):
+        """Test that default lists are copied into each configuration."""
+        with patch.dict(os.environ, {"GIT_SIM_CORS_CONFIG": "{}"}):
+            first = get_cors_config()
+            second = get_cors_config()
+
+            assert first["allow_methods"] == second["allow_methods"]
+            assert first["allow_methods"] is not second["allow_methods"]
+
+    def test_cors_config_is_read_only(self):
+        """Test that the returned CORS configuration cannot be modified."""
+        with patch.dict(os.environ, {}, clear=True):
+            config = get_cors_config()
+
+            with pytest.raises(TypeError):
+                config["allow_origins"] = ["https://example.com"]
+
+
+class TestHealthCheck:
+    """Test the health check endpoint."""
+
+    def test_health_check(self):
+        """Test that the health endpoint reports a healthy SSE service."""
+        response = TestClient(app).get("/health")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {
+            "status": "healthy",
+            "service": "git-sim-mcp",
+            "transport": "sse",
+        }
+
+
+class TestRun:
+    """Test the event loop runner."""
+
+    def test_run_without_uvloop(self):
+        """Test that the default asyncio loop is used when uvloop is missing."""
+
+        async def answer():
+            return 42
+
+        with patch.dict(sys.modules, {"uvloop": None}):
+            assert run(answer()) == 42
+
 
 if __name__ == "__main__":
-    import pytest
     pytest.main([__file__, "-v"])
@@ -0,0 +1,93 @@
+"""Tests for the buffered stdio transport."""
+
+import asyncio
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from git_sim_mcp._stdio_buffered import BufferedStdio, _PipeReader
+
+
+def feed(protocol, data):
+    """Deliver data to the protocol the way a transport would."""
+    while data:
+        buffer = protocol.get_buffer(-1)
+        nbytes = min(len(buffer), len(data))
+        buffer[:nbytes] = data[:nbytes]
+        protocol.buffer_updated(nbytes)
+        data = data[nbytes:]
+
+
+def drain(queue):
+    """Collect everything currently in the queue."""
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+class TestBufferedStdio:
+    """Test line splitting in the buffered protocol."""
+
+    def test_lines_split_across_reads(self):
+        """Test that frames split over several reads are reassembled."""
+        lines = asyncio.Queue()
+        protocol = BufferedStdio(lines)
+        protocol.connection_made(Mock())
+
+        feed(protocol, b'{"id": 1}\n{"id"')
+        feed(protocol, b': 2}\n{"id": 3}')
+        protocol.eof_received()
+
+        assert drain(lines) == [b'{"id": 1}', b'{"id": 2}', b'{"id": 3}', None]
+
+    def test_long_line(self):
+        """Test that a frame larger than the read buffer is kept intact."""
+        lines = asyncio.Queue()
+        protocol = BufferedStdio(lines)
+        protocol.connection_made(Mock())
+        frame = b"x" * (200 * 1024)
+
+        feed(protocol, b"a\n" + frame + b"\nb\n")
+
+        assert drain(lines) == [b"a", frame, b"b"]
+
+    def test_pauses_when_consumer_falls_behind(self):
+        """Test that reading pauses while too many lines are queued."""
+        lines = asyncio.Queue()
+        transport = Mock()
+        protocol = BufferedStdio(lines)
+        protocol.connection_made(transport)
+
+        feed(protocol, b"{}\n" * 100)
+        transport.pause_reading.assert_called_once()
+
+        drain(lines)
+        protocol.resume()
+        transport.resume_reading.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestPipeReader:
+    """Test reading a pipe through the buffered protocol."""
+
+    async def test_reads_pipe_until_eof(self):
+        """Test that all lines written to a pipe are delivered, then EOF."""
+        read_fd, write_fd = os.pipe()
+        lines = asyncio.Queue()
+        transport = _PipeReader(
+            asyncio.get_running_loop(), read_fd, BufferedStdio(lines)
+        )
+        try:
+            os.write(write_fd, b'{"id": 1}\n{"id": 2}\n')
+            os.close(write_fd)
+
+            received = []
+            while (line := await asyncio.wait_for(lines.get(), 5)) is not None:
+                received.append(line)
+        finally:
+            transport.close()
+            os.close(read_fd)
+
+        assert received == [b'{"id": 1}', b'{"id": 2}']
@@ -0,0 +1,54 @@
+"""Tests for removing directory trees through io_uring."""
+
+import os
+
+import pytest
+
+from git_sim_mcp import _uring_rmtree
+from git_sim_mcp._uring_rmtree import uring_rmtree
+
+
+def make_tree(root, target):
+    """Create a small repository-like tree, with a symlink out of it."""
+    for name in ("objects/ab", "objects/cd", "refs/heads"):
+        os.makedirs(root / ".git" / name)
+        (root / ".git" / name / "file").write_text(name)
+    (root / "README.md").write_text("readme")
+    os.symlink(target, root / "link")
+
+
+@pytest.mark.skipif(_uring_rmtree.liburing is None, reason="liburing not installed")
+class TestUringRmtree:
+    """Test io_uring tree removal."""
+
+    def test_removes_trees(self, tmp_path):
+        """Test that whole trees are removed without following symlinks."""
+        target = tmp_path / "target"
+        target.mkdir()
+        (target / "keep").write_text("keep")
+        for name in ("repo1", "repo2"):
+            make_tree(tmp_path / name, target)
+
+        uring_rmtree([str(tmp_path / "repo1"), str(tmp_path / "repo2")])
+
+        assert not (tmp_path / "repo1").exists()
+        assert not (tmp_path / "repo2").exists()
+        assert (target / "keep").exists()
+
+    def test_missing_tree_is_ignored(self, tmp_path):
+        """Test that missing trees do not stop the others being removed."""
+        make_tree(tmp_path / "repo", tmp_path)
+
+        uring_rmtree([str(tmp_path / "missing"), str(tmp_path / "repo")])
+
+        assert not (tmp_path / "repo").exists()
+
+
+def test_without_liburing_does_nothing(tmp_path, monkeypatch):
+    """Test that trees are left for shutil.rmtree() without liburing."""
+    monkeypatch.setattr(_uring_rmtree, "liburing", None)
+    make_tree(tmp_path / "repo", tmp_path)
+
+    uring_rmtree([str(tmp_path / "repo")])
+
+    assert (tmp_path / "repo" / "README.md").exists()
@@ -0,0 +1,119 @@
+"""Tests for persistent git-sim workers."""
+
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import click
+import pytest
+
+from git_sim_mcp.workers import GitSimWorkerPool, run_command, worker_pool_size
+
+# A stand-in worker that answers each frame with its argv, cwd and pid
+FAKE_WORKER = (
+    sys.executable,
+    "-c",
+    "import json, os, sys\n"
+    "for line in sys.stdin:\n"
+    "    request = json.loads(line)\n"
+    "    stdout = ' '.join(request['argv']) + ' ' + request['cwd']\n"
+    "    response = {'returncode': 0, 'stdout': stdout, 'stderr': str(os.getpid())}\n"
+    "    print(json.dumps(response), flush=True)\n",
+)
+
+
+@click.group()
+def fake_git_sim():
+    """A minimal CLI standing in for git-sim."""
+
+
+@fake_git_sim.command()
+@click.option("-n", default=5)
+def log(n):
+    click.echo(f"/tmp/git-sim-log-{n}.jpg")
+
+
+class TestRunCommand:
+    """Test in-process command execution."""
+
+    def test_captures_stdout(self):
+        """Test that command output is captured."""
+        result = run_command(fake_git_sim, ["log", "-n", "3"])
+
+        assert result["returncode"] == 0
+        assert result["stdout"] == "/tmp/git-sim-log-3.jpg\n"
+
+    def test_usage_error(self):
+        """Test that usage errors are reported like the CLI would."""
+        result = run_command(fake_git_sim, ["unknown"])
+
+        assert result["returncode"] == 2
+        assert "No such command" in result["stderr"]
+
+
+class TestWorkerPoolSize:
+    """Test worker pool sizing."""
+
+    def test_disabled_by_default(self):
+        """Test that workers are disabled unless configured."""
+        with patch.dict(os.environ, {}, clear=True):
+            assert worker_pool_size() == 0
+
+    def test_capped_at_cpu_count(self):
+        """Test that the pool never exceeds the number of CPUs."""
+        with patch.dict(os.environ, {"GIT_SIM_WORKERS": "10000"}):
+            assert worker_pool_size() == (os.cpu_count() or 1)
+
+
+@pytest.mark.asyncio
+class TestGitSimWorkerPool:
+    """Test the worker pool."""
+
+    async def test_worker_is_reused(self, tmp_path):
+        """Test that consecutive commands run on the same worker process."""
+        pool = GitSimWorkerPool(1, command=FAKE_WORKER)
+        try:
+            first = await pool.run(["git-sim", "-d", "log"], str(tmp_path))
+            second = await pool.run(["git-sim", "-d", "status"], str(tmp_path))
+        finally:
+            await pool.close()
+
+        assert first[:2] == (0, f"-d log {tmp_path}")
+        assert second[:2] == (0, f"-d status {tmp_path}")
+        assert first[2] == second[2]
+
+    async def test_failed_worker_is_replaced(self, tmp_path):
+        """Test that a worker is discarded when its command is interrupted."""
+        pool = GitSimWorkerPool(1, command=FAKE_WORKER)
+        try:
+            with pytest.raises(RuntimeError):
+                async with pool.acquire() as worker:
+                    first_pid = worker.process.pid
+                    raise RuntimeError("interrupted")
+
+            _, _, second_pid = await pool.run(["git-sim", "log"], str(tmp_path))
+        finally:
+            await pool.close()
+
+        assert int(second_pid) != first_pid
+
+    async def test_waiter_gets_replacement_for_failed_worker(self, tmp_path):
+        """Test that a queued command runs when the busy worker is discarded."""
+        pool = GitSimWorkerPool(1, command=FAKE_WORKER)
+        try:
+            with pytest.raises(RuntimeError):
+                async with pool.acquire() as worker:
+                    first_pid = worker.process.pid
+                    waiter = asyncio.create_task(
+                        pool.run(["git-sim", "log"], str(tmp_path))
+                    )
+                    await asyncio.sleep(0.01)
+                    assert not waiter.done()
+                    raise RuntimeError("interrupted")
+
+            _, _, second_pid = await asyncio.wait_for(waiter, timeout=10)
+        finally:
+            await pool.close()
+
+        assert int(second_pid) != first_pid